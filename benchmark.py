@@ -0,0 +1,238 @@
+# Maze Generator benchmarks
+# times the hot paths of maze_generator.py without a window (SDL dummy video driver)
+#   python benchmark.py --out results.json
+#   python benchmark.py --baseline results.json --threshold 0.2
+# exits with 1 when a case is slower than the baseline by more than the threshold
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import pygame
+import maze_generator as mg
+
+# pygame.draw functions counted as draw calls
+DRAW_FUNCTIONS = ["line", "lines", "aaline", "aalines", "rect", "polygon", "circle", "ellipse", "arc"]
+
+class CountedSurface(pygame.Surface):
+	# surface whose blit() and blits() calls are counted -- only made while a DrawCounter is active
+	counter = None
+
+	def blit(self, *args, **kwargs):
+		if self.counter:
+			self.counter.calls += 1
+		return super().blit(*args, **kwargs)
+
+	def blits(self, blit_sequence, *args, **kwargs):
+		# one draw call, and every source it blits as a tile
+		if self.counter:
+			blit_sequence = list(blit_sequence)
+			self.counter.calls += 1
+			self.counter.tiles += len(blit_sequence)
+		return super().blits(blit_sequence, *args, **kwargs)
+
+	@classmethod
+	def copy_of(cls, surface, counter):
+		# counted copy of a surface, colorkey and all
+		copy = cls(surface.get_size(), surface.get_flags() & pygame.SRCALPHA, surface)
+		colorkey = surface.get_colorkey()
+		if colorkey:
+			copy.fill(colorkey) # the transparent pixels are not blitted
+			copy.set_colorkey(colorkey, surface.get_flags() & pygame.RLEACCEL)
+		copy.blit(surface, (0, 0))
+		copy.counter = counter
+		return copy
+
+class CountedPygame():
+	# stands in for the pygame module inside maze_generator.py while a DrawCounter is active,
+	# so the surfaces it makes during the counted run are counted -- pygame.Surface itself is left alone
+	def __init__(self, counter):
+		self.counter = counter
+
+	def Surface(self, *args, **kwargs):
+		surface = CountedSurface(*args, **kwargs)
+		surface.counter = self.counter
+		return surface
+
+	def __getattr__(self, name):
+		return getattr(pygame, name)
+
+class DrawCounter():
+	# counts pygame.draw calls and blits while active -- calls (one per blits() too) and the tiles blits() blitted
+	# the maze's surfaces are swapped for counted copies, the timed runs never go through the counting
+	def __init__(self, maze=None):
+		self.calls = 0
+		self.tiles = 0
+		self.maze = maze
+		self.originals = {}
+		self.swapped = {}
+
+	def __enter__(self):
+		for name in DRAW_FUNCTIONS:
+			original = getattr(pygame.draw, name)
+			self.originals[name] = original
+			setattr(pygame.draw, name, self.wrap(original))
+		mg.pygame = CountedPygame(self)
+		if self.maze:
+			for name in ("surface", "wall_layer"):
+				original = getattr(self.maze, name)
+				if original:
+					self.swapped[name] = (original, CountedSurface.copy_of(original, self))
+					setattr(self.maze, name, self.swapped[name][1])
+		return self
+
+	def wrap(self, function):
+		def counted(*args, **kwargs):
+			self.calls += 1
+			return function(*args, **kwargs)
+		return counted
+
+	def __exit__(self, *exc):
+		for name, original in self.originals.items():
+			setattr(pygame.draw, name, original)
+		mg.pygame = pygame
+		for name, (original, copy) in self.swapped.items():
+			if getattr(self.maze, name) is copy: # not replaced during the run
+				setattr(self.maze, name, original)
+
+def new_maze(size, engine, exits):
+	# square maze, generated and with its exits
+	maze = mg.Maze((size, size), 60)
+	maze.engine = engine
+	maze.exits = exits
+	maze.remap()
+	return maze
+
+def measure(run, repeat, maze=None, min_time=0.25):
+	# time run() at least repeat times, and until min_time seconds have passed (fast cases are noisy),
+	# then once more for its peak python memory and draw calls
+	times = []
+	while len(times) < repeat or (sum(times) < min_time and len(times) < 1000):
+		start = time.perf_counter()
+		run()
+		times.append(time.perf_counter() - start)
+	times.sort()
+	with DrawCounter(maze) as counter:
+		tracemalloc.start()
+		run()
+		_, peak = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+	return {
+		"min": times[0],
+		"median": times[len(times) // 2],
+		"runs": len(times),
+		"peak_kb": round(peak / 1024, 1), # python allocations only -- surface pixels live outside the python heap
+		"draw_calls": counter.calls,
+		"blit_tiles": counter.tiles,
+	}
+
+def cases(options, directory):
+	# (name, run, maze) of every benchmark -- mazes are built up front so only the measured call is timed
+	for size in options.sizes:
+		maze = new_maze(size, options.engine, options.exits)
+		shape = str(size) + "x" + str(size)
+		if options.engine == "dfs_recursive" and size > mg.Maze.RECURSIVE_MAX_TILES:
+			# remap() generates it with the iterative dfs -- not timed under the recursive name
+			print("generate/dfs_recursive/" + shape + " skipped -- over " + str(mg.Maze.RECURSIVE_MAX_TILES) + " cells a side the iterative dfs is used")
+		else:
+			yield "generate/" + options.engine + "/" + shape, maze.remap, maze
+		for exits in mg.EXIT_MODES:
+			def find_exits(maze=maze, exits=exits):
+				maze.exits = exits
+				maze.find_exits()
+			yield "find_exits/" + exits + "/" + shape, find_exits, maze
+		maze.exits = options.exits
+		maze.find_exits()
+		for zoom in options.zooms:
+			maze.set_zoom(zoom)
+			def draw_borders(maze=maze):
+				maze.fill()
+				maze.draw_borders()
+			yield "draw_borders/" + shape + "/zoom" + str(zoom), draw_borders, maze
+			if maze.layer_fits(maze.tilesize, maze.line_width):
+				def build_layer(maze=maze):
+					# forget the cached wall layer so it is drawn again
+					maze.wall_layer_key = None
+					maze.fill()
+					maze.draw_borders()
+				yield "wall_layer/" + shape + "/zoom" + str(zoom), build_layer, maze
+		# fully zoomed in the wall layer is too big to cache, only the visible cells are drawn every frame
+		maze.set_zoom(0)
+		if not maze.layer_fits(maze.tilesize, maze.line_width):
+			def draw_uncached(maze=maze):
+				maze.fill()
+				maze.draw_borders()
+			yield "draw_borders/" + shape + "/uncached", draw_uncached, maze
+		if size <= options.paper_max:
+			yield "to_paper/" + shape, lambda maze=maze: maze.to_paper(True), maze
+			filepath = os.path.join(directory, "maze." + mg.IMAGE_FORMAT)
+			yield "save_image/" + shape, lambda maze=maze: maze.save_image(filepath, True), maze
+
+def compare(results, baseline, threshold):
+	# names of the cases whose best time is more than threshold slower than the baseline
+	slower = []
+	for name, result in results.items():
+		if name not in baseline:
+			continue
+		ratio = result["min"] / max(baseline[name]["min"], 1e-9)
+		flag = ""
+		if ratio > 1 + threshold:
+			flag = "  REGRESSION"
+			slower.append(name)
+		print("  " + name.ljust(40) + str(round(ratio, 2)).rjust(6) + "x" + flag)
+	return slower
+
+def number_list(text, kind=int):
+	return [kind(value) for value in text.split(",")]
+
+def main(args):
+	parser = argparse.ArgumentParser(description="Benchmark generation, exit finding, drawing and saving.")
+	parser.add_argument("--sizes", type=number_list, default=[20, 100, 500], help="maze sides, comma separated")
+	parser.add_argument("--zooms", type=lambda text: number_list(text, float), default=[0.25, 0.75, 1.0], help="zoom levels (0 - 1) for drawing")
+	parser.add_argument("--paper-max", type=int, default=100, help="largest side rendered to paper and saved")
+	parser.add_argument("--engine", default=mg.Maze.DEFAULT_ENGINE, choices=list(mg.ENGINES) + ["dfs_recursive"])
+	parser.add_argument("--exits", default=mg.Maze.DEFAULT_EXITS, choices=list(mg.EXIT_MODES))
+	parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--out", default=None, help="write the results to this json file")
+	parser.add_argument("--baseline", default=None, help="results json to compare against")
+	parser.add_argument("--threshold", type=float, default=0.2, help="allowed slow down, 0.2 = 20%%")
+	options = parser.parse_args(args)
+
+	random.seed(options.seed)
+	results = {}
+	with tempfile.TemporaryDirectory() as directory:
+		for name, run, maze in cases(options, directory):
+			results[name] = measure(run, options.repeat, maze)
+			result = results[name]
+			print(name.ljust(40) + (str(round(result["min"] * 1000, 3)) + " ms").rjust(12) + (str(result["peak_kb"]) + " kB").rjust(12) + (str(result["draw_calls"]) + " draws").rjust(14) + (str(result["blit_tiles"]) + " tiles").rjust(14))
+
+	report = {
+		"python": platform.python_version(),
+		"pygame": pygame.version.ver,
+		"platform": platform.platform(),
+		"date": time.strftime("%Y-%m-%d %H:%M:%S"),
+		"repeat": options.repeat,
+		"results": results,
+	}
+	if options.out:
+		with open(options.out, "w") as file:
+			json.dump(report, file, indent=1)
+	if options.baseline:
+		with open(options.baseline) as file:
+			baseline = json.load(file)["results"]
+		print("\nCompared to " + options.baseline + " (best times):")
+		slower = compare(results, baseline, options.threshold)
+		if slower:
+			print(str(len(slower)) + " regression(s) over " + str(round(options.threshold * 100)) + "%")
+			return 1
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
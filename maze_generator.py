@@ -6,8 +6,23 @@ import re
 import math
 import random
 import time
-
-pygame.init()
+import zlib
+import struct
+import threading
+import heapq
+import argparse
+import csv
+import json
+import atexit
+import functools
+import contextlib
+import multiprocessing
+from collections import deque
+from array import array
+try:
+	import numpy as np
+except ImportError:
+	np = None # vectorized batch generators and the pixel rasterizer are unavailable
 
 ## change constant
 #! debugging
@@ -20,27 +35,106 @@ DEFAULT_WINY = 900 # static
 AR = DEFAULT_WINX / DEFAULT_WINY
 WIN_SIZE = [DEFAULT_WINX, DEFAULT_WINY] # may change
 PRESS_ESC = True
-DISPLAY = pygame.display.Info()
-DISPLAY_SIZE = (DISPLAY.current_w, DISPLAY.current_h) # [width,height] of hardware screen in pixels
+DISPLAY_SIZE = None # [width,height] of hardware screen in pixels -- set by screen_init()
 
 # Path to root folder -- frozen indicates being run from binary
-ROOT = '../' if getattr(sys, 'frozen', False) else './'
+ROOT = '../' if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__)) + '/' # not the working directory -- batch mode runs from anywhere
 
 # Images
 IMAGE_FORMAT = "jpg" # format mazes will be saved as
-try:
-	STAR_IMAGE = pygame.image.load(ROOT + "masks/star.png")
-	CROWN_IMAGE = pygame.image.load(ROOT + "masks/crown.png")
-	CROWN_2_IMAGE = pygame.image.load(ROOT + "masks/crown_2.png")
-	L_ARROW = pygame.image.load(ROOT + "menu/left_arrow.png")
-	R_ARROW = pygame.image.load(ROOT + "menu/right_arrow.png")
-	SL_ARROW = pygame.image.load(ROOT + "menu/selected_left_arrow.png")
-	SR_ARROW = pygame.image.load(ROOT + "menu/selected_right_arrow.png")
-	MAZE_ICON = pygame.image.load(ROOT + "resources/maze_icon.png")
-except Exception as e:
-	print("Could not locate all resources...")
-	print(str(e))
-	sys.exit(1)
+IMAGE_FILES = {
+	"star": "masks/star.png",
+	"crown": "masks/crown.png",
+	"crown_2": "masks/crown_2.png",
+	"left_arrow": "menu/left_arrow.png",
+	"right_arrow": "menu/right_arrow.png",
+	"selected_left_arrow": "menu/selected_left_arrow.png",
+	"selected_right_arrow": "menu/selected_right_arrow.png",
+	"maze_icon": "resources/maze_icon.png",
+}
+IMAGES = {} # loaded on first use
+
+def get_image(name):
+	# surface of a resource image, read from disk the first time it is needed
+	if name not in IMAGES:
+		try:
+			IMAGES[name] = pygame.image.load(ROOT + IMAGE_FILES[name])
+		except Exception as e:
+			print("Could not locate all resources...")
+			print(str(e))
+			sys.exit(1)
+	return IMAGES[name]
+
+# TRACING
+# opt-in timeline of where the time goes -- set MAZE_TRACE=trace.json to record spans of generation, exits, rendering,
+# exports, menus and every frame, then open the file in chrome://tracing or ui.perfetto.dev
+# only the newest events are kept (ring buffer), and they are written on exit or with ctrl + t
+TRACER = None # Tracer while tracing, see start_tracing()
+
+class Tracer():
+	SIZE = 200000 # events kept
+	def __init__(self, filepath, size=SIZE):
+		self.filepath = filepath
+		self.events = deque(maxlen=size) # oldest events fall off
+		self.threads = {} # thread id: name
+		self.pid = os.getpid()
+
+	def complete(self, name, start, end, category="maze", args=None):
+		# span from start to end (perf_counter seconds) on the current thread
+		tid = threading.get_ident()
+		if tid not in self.threads:
+			self.threads[tid] = threading.current_thread().name
+		event = {"name": name, "cat": category, "ph": "X", "ts": start * 1e6, "dur": (end - start) * 1e6, "pid": self.pid, "tid": tid}
+		if args:
+			event["args"] = args
+		self.events.append(event)
+
+	def instant(self, name, category="maze", args=None):
+		tid = threading.get_ident()
+		if tid not in self.threads:
+			self.threads[tid] = threading.current_thread().name
+		event = {"name": name, "cat": category, "ph": "i", "s": "t", "ts": time.perf_counter() * 1e6, "pid": self.pid, "tid": tid}
+		if args:
+			event["args"] = args
+		self.events.append(event)
+
+	@contextlib.contextmanager
+	def span(self, name, category="maze", args=None):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.complete(name, start, time.perf_counter(), category, args)
+
+	def flush(self):
+		# write everything in the buffer as a chrome trace (json object format) -- replaces the previous file
+		names = [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}} for tid, name in list(self.threads.items())]
+		with open(self.filepath, "w") as file:
+			json.dump({"traceEvents": names + list(self.events), "displayTimeUnit": "ms"}, file)
+
+def start_tracing(filepath):
+	# record from now on -- the trace is also written when the program exits
+	global TRACER
+	TRACER = Tracer(filepath)
+	atexit.register(TRACER.flush)
+
+def trace_span(name, category="maze", **args):
+	# context manager -- a span on the timeline while tracing, otherwise nothing
+	if TRACER == None:
+		return contextlib.nullcontext()
+	return TRACER.span(name, category, args)
+
+def traced(name, category="maze"):
+	# decorator -- every call is a span while tracing
+	def decorate(function):
+		@functools.wraps(function)
+		def wrapper(*args, **kwargs):
+			if TRACER == None:
+				return function(*args, **kwargs)
+			with TRACER.span(name, category):
+				return function(*args, **kwargs)
+		return wrapper
+	return decorate
 
 # COLORS
 # ----- basic -----
@@ -52,6 +146,7 @@ RED = (255,0,0)
 GREEN = (0,255,0)
 BLUE = (0,0,255)
 YELLOW = (255,255,0)
+MAGENTA = (255,0,255)
 # --- dull ---
 DIM_GREY = (60,60,60)
 DIM_YELLOW = (100,100,0)
@@ -64,58 +159,1064 @@ TEXT_YELLOW = (230,230,0)
 SUCCESS_GREEN = (12,230,70)
 ERROR_RED = (208,28,28)
 
-class Block():
-	def __init__(self, row, col):
-		# pos in array
-		self.pos = (row, col)
-		# 1 = blocked
-		self.left = 1
-		self.right = 1
-		self.top = 1
-		self.bottom = 1
-		# 0 = unvisited
-		self.visited = 0
-		return
+# WALLS
+# one byte per cell -- bit set = blocked
+LEFT = 1
+TOP = 2
+RIGHT = 4
+BOTTOM = 8
+WALLS = 15 # all four walls
+VISITED = 16 # used while generating
+OPPOSITE = {LEFT: RIGHT, TOP: BOTTOM, RIGHT: LEFT, BOTTOM: TOP}
+BORDER_COUNT = [bin(code).count("1") for code in range(16)] # walls in each wall code
+DEAD_END_BYTES = bytes(BORDER_COUNT[code & WALLS] == 3 for code in range(256)) # bytes.translate table -- 1 for dead ends
+NODE_BYTES = bytes(BORDER_COUNT[code & WALLS] != 2 for code in range(256)) # 1 for every cell that is not part of a corridor
+BORDER_BYTES = bytes(BORDER_COUNT[code & WALLS] for code in range(256)) # number of walls of every cell
+VISITED_BYTES = bytes(bool(code & VISITED) for code in range(256))
+SIDE_BYTES = {side: bytes(bool(code & side) for code in range(256)) for side in (LEFT, TOP, RIGHT, BOTTOM)} # 1 where that wall is set
+
+class Grid():
+	# compact maze storage -- wall bits and the visited flag of every cell packed into a bytearray
+	# cell [row,col] is stored at index (row * cols + col)
+	def __init__(self, rows, cols):
+		self.rows = rows
+		self.cols = cols
+		self.cells = None
+		self.distances = None
+		self.distance_target = None
+		self.junctions = None
+		self.build_time = None # seconds the engine and exits took (None if unknown)
+		self.reset()
 
-	def borders(self):
-		total = 0
-		edges = [self.left, self.top, self.right, self.bottom]
-		for x in edges:
-			total += x
-		return total
+	def reset(self):
+		# every cell blocked on all sides and unvisited -- a single allocation
+		self.cells = bytearray([WALLS]) * (self.rows * self.cols)
+		self.distances = None # steps from every cell to distance_target (usually the finish), see distance_field()
+		self.distance_target = None
+		self.junctions = None # JunctionGraph, see junction_graph()
+
+	def walls(self, row, col):
+		# wall code (0-15) of a cell
+		return self.cells[row * self.cols + col] & WALLS
+
+	def is_open(self, row, col, side):
+		return not (self.cells[row * self.cols + col] & side)
+
+	def borders(self, row, col):
+		# number of walls around a cell
+		return BORDER_COUNT[self.cells[row * self.cols + col] & WALLS]
+
+	def visited(self, row, col):
+		return self.cells[row * self.cols + col] & VISITED
+
+	def set_visited(self, row, col):
+		self.cells[row * self.cols + col] |= VISITED
+
+	def carve(self, row, col, side):
+		# remove the wall on one side of a cell, and the matching wall of its neighbour
+		i = row * self.cols + col
+		if side == LEFT:
+			k = i - 1
+		elif side == RIGHT:
+			k = i + 1
+		elif side == TOP:
+			k = i - self.cols
+		else: # BOTTOM
+			k = i + self.cols
+		self.cells[i] &= ~side
+		self.cells[k] &= ~OPPOSITE[side]
+
+	def nearest_dead_end(self, corner):
+		# closest cell with 3 walls to a corner ("bottom_left" or "top_right"), or -1 if there is none
+		# searches square rings of growing radius around the corner, each ring as two straight legs --
+		# bottom left: its top row left to right, then its right column top to bottom
+		# top right: its left column top to bottom, then its bottom row left to right
+		# only the rings up to the first dead end are read, so the cost does not grow with the maze
+		rows = self.rows
+		cols = self.cols
+		cells = self.cells
+		for r in range(max(rows, cols)):
+			if corner == "bottom_left":
+				row = rows-1 - r
+				if row >= 0: # top of the ring
+					start = row * cols
+					p = cells[start:start + min(r, cols-1) + 1].translate(DEAD_END_BYTES).find(1)
+					if p != -1:
+						return (row, p)
+				if r < cols: # right side of the ring
+					first_row = max(rows - r, 0)
+					p = cells[first_row * cols + r::cols].translate(DEAD_END_BYTES).find(1)
+					if p != -1:
+						return (first_row + p, r)
+			else: # top right
+				col = cols-1 - r
+				if col >= 0: # left side of the ring
+					p = cells[col:min(r, rows-1) * cols + col + 1:cols].translate(DEAD_END_BYTES).find(1)
+					if p != -1:
+						return (p, col)
+				if r < rows: # bottom of the ring
+					first_col = max(cols - r, 0)
+					p = cells[r * cols + first_col:(r+1) * cols].translate(DEAD_END_BYTES).find(1)
+					if p != -1:
+						return (r, first_col + p)
+		print('Error nearest_dead_end() - no cell has 3 borders!')
+		return -1
+
+	def moves(self):
+		# index offsets through the open sides of every cell code
+		# the outer walls are never carved, so a move never leaves the grid
+		sides = ((LEFT, -1), (TOP, -self.cols), (RIGHT, 1), (BOTTOM, self.cols))
+		return [tuple(offset for side, offset in sides if not code & side) for code in range(256)]
+
+	def distances_from(self, source):
+		# breadth first search through the open walls (iterative) -- returns the steps from the source
+		# index to every cell as an array (-1 = unreachable), and the index of the last cell reached
+		cells = self.cells
+		moves = self.moves()
+		dist = array("i", [-1]) * len(cells)
+		dist[source] = 0
+		queue = array("i", [source])
+		for i in queue: # grows while it is read
+			d = dist[i] + 1
+			for k in moves[cells[i]]:
+				k += i
+				if dist[k] < 0:
+					dist[k] = d
+					queue.append(k)
+		return dist, queue[-1]
+
+	def distance_field(self, target):
+		# steps from every cell to the target index -- kept until the target changes or the grid is reset
+		if self.distances == None or self.distance_target != target:
+			self.distances, _ = self.distances_from(target)
+			self.distance_target = target
+		return self.distances
+
+	def junction_graph(self, extra=()):
+		# corridor-compressed graph of this maze -- built once, and again only if an extra cell is not a node yet
+		if self.junctions == None or any(self.junctions.node_of[i] < 0 for i in extra):
+			self.junctions = JunctionGraph(self, extra)
+		return self.junctions
+
+	def validate(self):
+		# None if this is a perfect maze, otherwise what is wrong with it -- linear time, checked in this order:
+		# the outer walls are closed, neighbours agree on every shared wall, there are exactly N-1 passages,
+		# and every cell is reachable (N-1 passages and connected means there are no loops)
+		rows = self.rows
+		cols = self.cols
+		cells = self.cells
+		n = len(cells)
+		left, top, right, bottom = (cells.translate(SIDE_BYTES[side]) for side in (LEFT, TOP, RIGHT, BOTTOM))
+		# outer walls
+		for name, flags in (("left", left[::cols]), ("right", right[cols-1::cols]), ("top", top[:cols]), ("bottom", bottom[n-cols:])):
+			if flags.count(0):
+				return "open " + name + " edge"
+		# shared walls -- cell i and the cell after it, with a closed edge where a row wraps to the next
+		for name, first, second, step in (("left / right", right, left, 1), ("top / bottom", bottom, top, cols)):
+			if first[:n-step] != second[step:]:
+				i = next(i for i in range(n - step) if first[i] != second[i + step])
+				return name + " walls disagree between " + str(list(divmod(i, cols))) + " and " + str(list(divmod(i + step, cols)))
+		# passages -- every passage opens two walls
+		borders = cells.translate(BORDER_BYTES)
+		passages = sum((4 - k) * borders.count(k) for k in range(4)) // 2
+		if passages != n - 1:
+			return str(passages) + " passages, a perfect maze has " + str(n - 1)
+		unreachable = self.distances_from(0)[0].count(-1)
+		if unreachable:
+			return str(unreachable) + " cells cannot be reached"
+		return None
+
+	def longest_path(self):
+		# ends of the longest path in the maze (its diameter) -- two breadth first searches:
+		# the cell farthest from any cell is one end, and the cell farthest from that is the other
+		# the distances of the second search are kept as the distance field to the finish
+		_, finish = self.distances_from(0)
+		self.distances, start = self.distances_from(finish)
+		self.distance_target = finish
+		return divmod(start, self.cols), divmod(finish, self.cols)
+
+	def find_exits(self, mode="corners"):
+		# Choose start and finish zones
+		if mode == "longest": # hardest exits -- ends of the longest path
+			return self.longest_path()
+		# dead ends closest to the bottom left and top right corners
+		start_cell = self.nearest_dead_end("bottom_left")
+		finish_cell = self.nearest_dead_end("top_right")
+		return start_cell, finish_cell
+
+def draw_walls(surface, walls, cell, color, tilesize, line_width, frame, origin=(0,0)):
+	# draw the walls of one cell [y,x] from its wall code
+	# anything drawn outside the bounds of the surface, is not seen! (the parts on screen will still be shown)
+	# origin - (x,y) pixel position of the frame on the surface
+	width = tilesize
+	height = tilesize
+	y = (cell[0] - frame[0]) * tilesize + origin[1]
+	x = (cell[1] - frame[1]) * tilesize + origin[0]
+	offset = int(line_width/2)
+
+	if walls & LEFT: # LEFT
+		pos = (x-offset, y-offset)
+		dim = (line_width, (height + 2*offset))
+		pygame.draw.rect(surface, color, (pos, dim))
+	if walls & RIGHT: # RIGHT
+		pos = (x-offset + width, y-offset)
+		dim = (line_width, (height + 2*offset))
+		pygame.draw.rect(surface, color, (pos, dim))
+	if walls & TOP: # TOP
+		pos = (x-offset, y-offset)
+		dim = ((width + 2*offset), line_width)
+		pygame.draw.rect(surface, color, (pos, dim))
+	if walls & BOTTOM: # BOTTOM
+		pos = (x-offset, y-offset + height)
+		dim = ((width + 2*offset), line_width)
+		pygame.draw.rect(surface, color, (pos, dim))
+	return
 
-	def drawlines(self, surface, color, tilesize, line_width, frame):
-		# anything drawn outside the bounds of the surface, is not seen! (the parts on screen will still be shown)
-		width = tilesize
-		height = tilesize
-		y = (self.pos[0] - frame[0]) * tilesize
-		x = (self.pos[1] - frame[1]) * tilesize
-		offset = int(line_width/2)
-
-		if self.left: # LEFT
-			pos = (x-offset, y-offset)
-			dim = (line_width, (height + 2*offset))
-			pygame.draw.rect(surface, color, (pos, dim))
-		if self.right: # RIGHT
-			pos = (x-offset + width, y-offset)
-			dim = (line_width, (height + 2*offset))
-			pygame.draw.rect(surface, color, (pos, dim))
-		if self.top: # TOP
-			pos = (x-offset, y-offset)
-			dim = ((width + 2*offset), line_width)
-			pygame.draw.rect(surface, color, (pos, dim))
-		if self.bottom: # BOTTOM
-			pos = (x-offset, y-offset + height)
-			dim = ((width + 2*offset), line_width)
-			pygame.draw.rect(surface, color, (pos, dim))
-		return
+def wall_runs(grid, upper_bounds=(0,0), lower_bounds=None):
+	# maximal straight runs of wall around a block of cells, from [first_row, first_col] up to (not including) [last_row, last_col]
+	# returns (horizontal, vertical) lists of (line, first, last) -- the wall along grid line `line` (row for horizontal
+	# runs, col for vertical ones -- rows / cols being the bottom / right edge) covering cells first to last (exclusive)
+	# each grid line is one bytes.translate and a regex scan, so shared walls are found once instead of once per neighbour
+	rows = grid.rows
+	cols = grid.cols
+	cells = grid.cells
+	if lower_bounds == None:
+		lower_bounds = (rows, cols)
+	first_row, first_col = upper_bounds
+	last_row, last_col = lower_bounds
+	horizontal = []
+	for line in range(first_row, last_row + 1):
+		if line < rows: # top walls of the row below the line
+			flags = cells[line * cols + first_col:line * cols + last_col].translate(SIDE_BYTES[TOP])
+		else: # bottom edge
+			flags = cells[(rows-1) * cols + first_col:(rows-1) * cols + last_col].translate(SIDE_BYTES[BOTTOM])
+		horizontal.extend((line, first_col + run.start(), first_col + run.end()) for run in re.finditer(b"\x01+", flags))
+	vertical = []
+	for line in range(first_col, last_col + 1):
+		if line < cols: # left walls of the column right of the line
+			flags = cells[first_row * cols + line:last_row * cols:cols].translate(SIDE_BYTES[LEFT])
+		else: # right edge
+			flags = cells[first_row * cols + cols-1:last_row * cols:cols].translate(SIDE_BYTES[RIGHT])
+		vertical.extend((line, first_row + run.start(), first_row + run.end()) for run in re.finditer(b"\x01+", flags))
+	return horizontal, vertical
+
+def draw_wall_runs(surface, runs, color, tilesize, line_width, frame):
+	# draw the runs of wall_runs() -- one rect per run, covering exactly what draw_walls() draws for every cell on it
+	horizontal, vertical = runs
+	offset = int(line_width/2)
+	for line, first, last in horizontal:
+		y = (line - frame[0]) * tilesize - offset
+		x = int((first - frame[1]) * tilesize - offset) # left end of the first cell, rounded the way its own rect would be
+		width = int((last - 1 - frame[1]) * tilesize - offset) - x + tilesize + 2*offset # to the right end of the last cell
+		pygame.draw.rect(surface, color, (x, y, width, line_width))
+	for line, first, last in vertical:
+		x = (line - frame[1]) * tilesize - offset
+		y = int((first - frame[0]) * tilesize - offset)
+		height = int((last - 1 - frame[0]) * tilesize - offset) - y + tilesize + 2*offset
+		pygame.draw.rect(surface, color, (x, y, line_width, height))
+
+def wall_cover(flags, tilesize, offset, length):
+	# pixels covered along each grid line -- flags (lines, cells) of walls, each spanning its cell plus half a line
+	# on either end, returns a (lines, length) bool array (numpy)
+	cells = flags.shape[1]
+	count = np.zeros((flags.shape[0], cells + 1), dtype=np.int32) # walls before each cell
+	np.cumsum(flags, axis=1, out=count[:, 1:])
+	pixel = np.arange(length)
+	first = np.clip((pixel - offset) // tilesize, 0, cells) # cells whose wall reaches a pixel
+	last = np.clip((pixel + offset) // tilesize + 1, 0, cells)
+	return count[:, last] > count[:, first]
+
+# up to these, writing the pixels (numpy) beats drawing wall rects -- the pixel work grows with the tile area
+# and the line width, the rect count does not (measured on 100x100 and 300x300 mazes: at tile size 16 and
+# below raster is up to 2.5x faster, at 20 they break even, at 50 with line width 1 rects are twice as fast)
+RASTER_MAX_TILESIZE = 16
+RASTER_MAX_WALL_AREA = 40 # tile size * line width
+
+def can_raster(surface, tilesize, line_width):
+	# pixels2d cannot map 24-bit surfaces
+	return np is not None and surface.get_bytesize() != 3 and tilesize <= RASTER_MAX_TILESIZE and tilesize * line_width <= RASTER_MAX_WALL_AREA
+
+def raster_walls(surface, grid, color, tilesize, line_width):
+	# every wall of the grid written straight into the pixels of a surface (numpy), the maze's top left corner at (0,0)
+	# covers exactly the pixels draw_walls() would -- rect edges half a line before each grid line, clipped to the surface
+	width, height = surface.get_size()
+	offset = int(line_width/2)
+	codes = np.frombuffer(bytes(grid.cells), dtype=np.uint8).reshape(grid.rows, grid.cols)
+	# walls on grid lines 0..rows (top walls, then the bottom edge) and 0..cols (left walls, then the right edge)
+	horizontal = np.concatenate(((codes & TOP) != 0, (codes[-1:] & BOTTOM) != 0))
+	vertical = np.concatenate(((codes & LEFT) != 0, (codes[:, -1:] & RIGHT) != 0), axis=1).T
+	along_x = wall_cover(horizontal, tilesize, offset, width)
+	along_y = wall_cover(vertical, tilesize, offset, height)
+	band = np.arange(line_width) - offset # pixel rows / columns of a line, around the grid line
+	value = surface.map_rgb(color)
+	pixels = pygame.surfarray.pixels2d(surface) # indexed [x,y], no copy -- the surface stays locked until this is deleted
+	# every pixel row of every horizontal line at once, then every pixel column of the vertical lines
+	# (only the line bands are copied out and written back, never the whole surface)
+	y = (np.arange(grid.rows + 1)[:, None] * tilesize + band).ravel()
+	line = np.repeat(np.arange(grid.rows + 1), line_width)
+	inside = (y >= 0) & (y < height)
+	rows = pixels[:, y[inside]]
+	rows[along_x[line[inside]].T] = value
+	pixels[:, y[inside]] = rows
+	x = (np.arange(grid.cols + 1)[:, None] * tilesize + band).ravel()
+	line = np.repeat(np.arange(grid.cols + 1), line_width)
+	inside = (x >= 0) & (x < width)
+	columns = pixels[x[inside]]
+	columns[along_y[line[inside]]] = value
+	pixels[x[inside]] = columns
+	del pixels
+
+@functools.lru_cache(maxsize=8) # one atlas per zoom level / line width in use -- the least recently used is dropped
+def tile_atlas(tilesize, line_width, color):
+	# the walls of every wall code (0-15) drawn on their own tile -- transparent (colorkey) apart from the walls
+	# a tile covers its cell plus the spill of its walls, so cell [y,x] is drawn at its top left corner - half a line
+	offset = int(line_width/2)
+	transparent = MAGENTA if color != MAGENTA else GREEN
+	tiles = []
+	for walls in range(16):
+		tile = pygame.Surface((tilesize + line_width, tilesize + line_width))
+		tile.fill(transparent)
+		draw_walls(tile, walls, (0,0), color, tilesize, line_width, (0,0), (offset, offset))
+		tile.set_colorkey(transparent, pygame.RLEACCEL)
+		tiles.append(tile)
+	return tiles
+
+def draw_wall_tiles(surface, grid, upper_bounds, lower_bounds, color, tilesize, line_width, frame):
+	# draw the walls of a block of cells [first_row, first_col] up to (not including) [last_row, last_col]
+	# as a single blits() call from the tile atlas -- cells without walls are skipped
+	tiles = tile_atlas(tilesize, line_width, tuple(color))
+	offset = int(line_width/2)
+	cells = grid.cells
+	cols = grid.cols
+	first_col = upper_bounds[1]
+	last_col = lower_bounds[1]
+	batch = []
+	for row in range(upper_bounds[0], lower_bounds[0]):
+		y = math.floor((row - frame[0]) * tilesize - offset)
+		start = row * cols
+		batch.extend((tiles[cells[start + col] & WALLS], (math.floor((col - frame[1]) * tilesize - offset), y)) for col in range(first_col, last_col) if cells[start + col] & WALLS)
+	surface.blits(batch, False)
+	return len(batch)
+
+# GENERATION ENGINES
+# each engine carves a perfect maze into a fully blocked Grid, starting from a seed cell [row,col]
+# all engines work on flat cell indices (row * cols + col) of grid.cells -- N = rows * cols
+
+def generate_dfs(grid, seed):
+	# randomized depth-first search (recursive backtracker) -- O(N) time, O(N) stack
+	# the path back is kept on an explicit stack instead of the call stack, so any maze size works
+	# neighbours are listed in the same order [left, top, right, bottom] and chosen with the same
+	# randint() call as Maze.generate(), so a given random seed produces the same maze
+	cells = grid.cells
+	rows = grid.rows
+	cols = grid.cols
+	randint = random.randint
+	start = seed[0] * cols + seed[1]
+	cells[start] |= VISITED
+	stack = [start] # path from the seed to the current cell
+
+	while stack:
+		i = stack[-1]
+		row, col = divmod(i, cols)
+		neighbours = [] # (index, side) of unvisited cells next to the current one
+		if col > 0 and not cells[i-1] & VISITED:
+			neighbours.append((i-1, LEFT))
+		if row > 0 and not cells[i-cols] & VISITED:
+			neighbours.append((i-cols, TOP))
+		if col < cols-1 and not cells[i+1] & VISITED:
+			neighbours.append((i+1, RIGHT))
+		if row < rows-1 and not cells[i+cols] & VISITED:
+			neighbours.append((i+cols, BOTTOM))
+
+		if not neighbours:
+			stack.pop() # retreat back to an old cell
+			continue
+		# choose random cell to advance to
+		k, side = neighbours[randint(1, len(neighbours)) - 1]
+		# remove the barrier (both sides) and advance
+		cells[i] &= ~side
+		cells[k] = (cells[k] & ~OPPOSITE[side]) | VISITED
+		stack.append(k)
+
+def generate_kruskal(grid, seed=None):
+	# randomized Kruskal -- shuffle every inner wall, remove it if it joins two separate regions
+	# O(N) to list and shuffle the walls + O(N * a(N)) union-find (path halving, union by size)
+	# the seed is not needed -- the tree grows everywhere at once
+	cells = grid.cells
+	rows = grid.rows
+	cols = grid.cols
+	n = rows * cols
+	# wall ids: 2*i = right wall of cell i, 2*i + 1 = bottom wall of cell i
+	edges = [2*i for i in range(n) if i % cols != cols-1]
+	edges += [2*i + 1 for i in range(n - cols)]
+	random.shuffle(edges)
+
+	parent = list(range(n)) # union-find forest
+	size = [1] * n
+	joined = 0
+	for e in edges:
+		i = e >> 1
+		k = i + cols if e & 1 else i + 1
+		# find roots -- halve the path on the way up
+		a = i
+		while parent[a] != a:
+			parent[a] = parent[parent[a]]
+			a = parent[a]
+		b = k
+		while parent[b] != b:
+			parent[b] = parent[parent[b]]
+			b = parent[b]
+		if a == b:
+			continue # already connected -- keep the wall
+		# union by size
+		if size[a] < size[b]:
+			a, b = b, a
+		parent[b] = a
+		size[a] += size[b]
+		# remove the barrier
+		if e & 1:
+			cells[i] &= ~BOTTOM
+			cells[k] &= ~TOP
+		else:
+			cells[i] &= ~RIGHT
+			cells[k] &= ~LEFT
+		joined += 1
+		if joined == n - 1: # spanning tree complete
+			break
+
+def generate_prim(grid, seed):
+	# randomized Prim -- grow one region by linking a random frontier cell to a random neighbour in the maze
+	# O(N) -- frontier cells are removed in O(1) by swapping them with the last entry
+	cells = grid.cells
+	rows = grid.rows
+	cols = grid.cols
+	randint = random.randint
+	in_frontier = bytearray(rows * cols)
+	frontier = []
+
+	def add_frontier(i):
+		row, col = divmod(i, cols)
+		for k, ok in ((i-1, col > 0), (i-cols, row > 0), (i+1, col < cols-1), (i+cols, row < rows-1)):
+			if ok and not cells[k] & VISITED and not in_frontier[k]:
+				in_frontier[k] = 1
+				frontier.append(k)
+
+	start = seed[0] * cols + seed[1]
+	cells[start] |= VISITED
+	add_frontier(start)
+
+	while frontier:
+		# random frontier cell -- swap with the last one and pop
+		j = randint(0, len(frontier) - 1)
+		i = frontier[j]
+		frontier[j] = frontier[-1]
+		frontier.pop()
+		# link to a random neighbour that is already part of the maze
+		row, col = divmod(i, cols)
+		links = []
+		if col > 0 and cells[i-1] & VISITED:
+			links.append((i-1, LEFT))
+		if row > 0 and cells[i-cols] & VISITED:
+			links.append((i-cols, TOP))
+		if col < cols-1 and cells[i+1] & VISITED:
+			links.append((i+1, RIGHT))
+		if row < rows-1 and cells[i+cols] & VISITED:
+			links.append((i+cols, BOTTOM))
+		k, side = links[randint(0, len(links) - 1)]
+		cells[i] = (cells[i] & ~side) | VISITED
+		cells[k] &= ~OPPOSITE[side]
+		add_frontier(i)
+
+def generate_wilson(grid, seed):
+	# Wilson's algorithm -- loop-erased random walks from every cell until they hit the tree
+	# produces a uniform spanning tree (unbiased maze)
+	# expected time is the sum of the walks' hitting times -- roughly O(N log N) on a grid,
+	# dominated by the first few walks while the tree is still small
+	cells = grid.cells
+	rows = grid.rows
+	cols = grid.cols
+	n = rows * cols
+	randint = random.randint
+	# last direction taken out of each cell -- overwriting it erases loops implicitly
+	exit_side = bytearray(n)
+	steps = ((-1, LEFT), (-cols, TOP), (1, RIGHT), (cols, BOTTOM))
+
+	cells[seed[0] * cols + seed[1]] |= VISITED # the tree starts as the seed
+	for start in range(n):
+		if cells[start] & VISITED:
+			continue
+		# random walk until the tree is reached
+		i = start
+		while not cells[i] & VISITED:
+			row, col = divmod(i, cols)
+			while True:
+				step, side = steps[randint(0, 3)]
+				if side == LEFT and col == 0 or side == RIGHT and col == cols-1:
+					continue
+				if side == TOP and row == 0 or side == BOTTOM and row == rows-1:
+					continue
+				break
+			exit_side[i] = side
+			i += step
+		# add the loop-erased path to the tree
+		i = start
+		while not cells[i] & VISITED:
+			side = exit_side[i]
+			if side == LEFT:
+				k = i - 1
+			elif side == TOP:
+				k = i - cols
+			elif side == RIGHT:
+				k = i + 1
+			else:
+				k = i + cols
+			cells[i] = (cells[i] & ~side) | VISITED
+			cells[k] &= ~OPPOSITE[side]
+			i = k
+
+def generate_hunt_and_kill(grid, seed):
+	# hunt-and-kill -- random walk until stuck, then hunt for the next unvisited cell beside the maze
+	# the hunt keeps a cursor over the cells in row order: every cell before it is visited, so the
+	# first unvisited cell borders the maze on its left or top (only cell 0 has neither)
+	# -- O(N) in total instead of rescanning the grid after every walk
+	cells = grid.cells
+	rows = grid.rows
+	cols = grid.cols
+	n = rows * cols
+	randint = random.randint
+	cursor = 0 # hunt index
+
+	def find_links(i, visited):
+		# (index, side) of the neighbours of cell i that are (visited) / are not (unvisited) in the maze
+		row, col = divmod(i, cols)
+		links = []
+		if col > 0 and bool(cells[i-1] & VISITED) == visited:
+			links.append((i-1, LEFT))
+		if row > 0 and bool(cells[i-cols] & VISITED) == visited:
+			links.append((i-cols, TOP))
+		if col < cols-1 and bool(cells[i+1] & VISITED) == visited:
+			links.append((i+1, RIGHT))
+		if row < rows-1 and bool(cells[i+cols] & VISITED) == visited:
+			links.append((i+cols, BOTTOM))
+		return links
+
+	i = seed[0] * cols + seed[1]
+	cells[i] |= VISITED
+	while True:
+		# KILL -- walk to random unvisited neighbours until stuck
+		neighbours = find_links(i, False)
+		while neighbours:
+			k, side = neighbours[randint(0, len(neighbours) - 1)]
+			cells[i] &= ~side
+			cells[k] = (cells[k] & ~OPPOSITE[side]) | VISITED
+			i = k
+			neighbours = find_links(i, False)
+		# HUNT -- first unvisited cell in row order
+		while cursor < n and cells[cursor] & VISITED:
+			cursor += 1
+		if cursor == n:
+			return # every cell visited
+		i = cursor
+		links = find_links(i, True)
+		while not links: # cell 0 before the maze has reached it -- keep scanning
+			i += 1
+			if not cells[i] & VISITED:
+				links = find_links(i, True)
+		# link it to a random visited neighbour
+		k, side = links[randint(0, len(links) - 1)]
+		cells[i] = (cells[i] & ~side) | VISITED
+		cells[k] &= ~OPPOSITE[side]
+
+def eller_rows(cols, rows):
+	# Eller's algorithm -- yields the maze one row of wall codes (bytearray) at a time
+	# only the set label of each cell in the current row is kept, so memory is O(cols) for any height
+	# O(cols log cols) per row -- sets are merged smaller into larger
+	randint = random.randint
+	labels = [0] * cols # set of each cell in the current row (0 = none yet)
+	next_label = 1
+	top_open = bytearray(cols) # cells carved into from the row above
+
+	for row in range(rows):
+		last = (row == rows - 1)
+		codes = bytearray([WALLS]) * cols
+		members = {} # label: cols in that set
+		for col in range(cols):
+			if top_open[col]:
+				codes[col] &= ~TOP
+			if not labels[col]: # new set
+				labels[col] = next_label
+				next_label += 1
+			members.setdefault(labels[col], []).append(col)
+
+		# join neighbours in different sets (always on the last row)
+		for col in range(cols - 1):
+			a = labels[col]
+			b = labels[col+1]
+			if a != b and (last or randint(0, 1)):
+				codes[col] &= ~RIGHT
+				codes[col+1] &= ~LEFT
+				if len(members[a]) < len(members[b]):
+					a, b = b, a
+				for k in members[b]:
+					labels[k] = a
+				members[a].extend(members.pop(b))
+		if last:
+			yield codes
+			return
+
+		# carve down -- at least once from every set
+		top_open = bytearray(cols)
+		next_labels = [0] * cols
+		for label, group in members.items():
+			down = [col for col in group if randint(0, 1)]
+			if not down:
+				down = [group[randint(0, len(group) - 1)]]
+			for col in down:
+				codes[col] &= ~BOTTOM
+				top_open[col] = 1
+				next_labels[col] = label
+		labels = next_labels
+		yield codes
+
+def generate_eller(grid, seed=None):
+	# Eller's algorithm written into a full grid -- O(N log cols)
+	# the seed is not needed -- rows are built top to bottom
+	cols = grid.cols
+	for row, codes in enumerate(eller_rows(cols, grid.rows)):
+		grid.cells[row * cols:(row + 1) * cols] = codes
+
+# BATCH GENERATORS (numpy)
+# whole batches of mazes at once -- returns a uint8 array of wall codes, shape (count, rows, cols)
+# every cell makes its choice independently, so there are no per-cell python loops
+# rng - numpy Generator, defaults to one seeded from the random module (random.seed() still applies)
+
+def batch_binary_tree(count, rows, cols, rng=None):
+	# binary tree -- every cell opens either its top or its right wall
+	# the top row can only open right and the right column can only open up -- O(count * N) array work
+	if rng is None:
+		rng = np.random.default_rng(random.getrandbits(64))
+	north = rng.integers(0, 2, size=(count, rows, cols), dtype=np.uint8).astype(bool)
+	north[:, 0, :] = False # top row -- always right
+	north[:, :, -1] = True # right column -- always up
+	north[:, 0, -1] = False # top right corner -- neither
+	east = ~north
+	east[:, :, -1] = False
+
+	codes = np.full((count, rows, cols), WALLS, dtype=np.uint8)
+	# every wall is removed at most once, so subtracting the bits is safe
+	codes -= north * np.uint8(TOP)
+	codes[:, :-1, :] -= north[:, 1:, :] * np.uint8(BOTTOM)
+	codes -= east * np.uint8(RIGHT)
+	codes[:, :, 1:] -= east[:, :, :-1] * np.uint8(LEFT)
+	return codes
+
+def batch_sidewinder(count, rows, cols, rng=None):
+	# sidewinder -- each row is split into runs of cells joined left to right, and every run opens
+	# upwards from one random cell (the top row is a single run) -- O(count * N) array work
+	if rng is None:
+		rng = np.random.default_rng(random.getrandbits(64))
+	east = rng.integers(0, 2, size=(count, rows, cols), dtype=np.uint8).astype(bool)
+	east[:, 0, :] = True # top row is one corridor
+	east[:, :, -1] = False # runs always end at the right edge
+
+	# a run starts at column 0 or after a cell that did not continue right
+	below = east[:, 1:, :] # rows that open upwards
+	starts = np.ones(below.shape, dtype=bool)
+	starts[:, :, 1:] = ~below[:, :, :-1]
+	# pick one cell per run -- the one with the largest random key
+	keys = rng.random(below.shape).ravel()
+	start_index = np.flatnonzero(starts.ravel())
+	run_max = np.maximum.reduceat(keys, start_index)
+	run_length = np.diff(np.append(start_index, keys.size))
+	north = np.zeros(east.shape, dtype=bool)
+	north[:, 1:, :] = (keys == np.repeat(run_max, run_length)).reshape(below.shape)
+
+	codes = np.full((count, rows, cols), WALLS, dtype=np.uint8)
+	codes -= north * np.uint8(TOP)
+	codes[:, :-1, :] -= north[:, 1:, :] * np.uint8(BOTTOM)
+	codes -= east * np.uint8(RIGHT)
+	codes[:, :, 1:] -= east[:, :, :-1] * np.uint8(LEFT)
+	return codes
+
+def generate_binary_tree(grid, seed=None):
+	# single maze from the batch generator -- the seed is not needed
+	grid.cells[:] = batch_binary_tree(1, grid.rows, grid.cols).tobytes()
+
+def generate_sidewinder(grid, seed=None):
+	grid.cells[:] = batch_sidewinder(1, grid.rows, grid.cols).tobytes()
+
+# registry -- engine key: (menu name, function)
+ENGINES = {
+	"dfs": ("Depth-First", generate_dfs),
+	"kruskal": ("Kruskal", generate_kruskal),
+	"prim": ("Prim", generate_prim),
+	"wilson": ("Wilson", generate_wilson),
+	"hunt_and_kill": ("Hunt and Kill", generate_hunt_and_kill),
+	"eller": ("Eller", generate_eller),
+}
+if np is not None:
+	ENGINES["binary_tree"] = ("Binary Tree", generate_binary_tree)
+	ENGINES["sidewinder"] = ("Sidewinder", generate_sidewinder)
+
+# exit placement -- key: menu name
+EXIT_MODES = {
+	"corners": "Corners",
+	"longest": "Longest Path",
+}
+
+@traced("build_maze")
+def build_maze(rows, cols, engine="dfs", seed=(0,0), exits="corners", validate=False):
+	# a new grid with its exits, without a Maze -- safe to call off the main thread
+	# validate - raise ValueError if the engine did not carve a perfect maze
+	if engine not in ENGINES:
+		engine = "dfs"
+	build_start = time.perf_counter()
+	grid = Grid(rows, cols)
+	ENGINES[engine][1](grid, seed)
+	if validate:
+		error = grid.validate()
+		if error:
+			raise ValueError(ENGINES[engine][0] + " maze is not perfect: " + error)
+	start_cell, finish_cell = grid.find_exits(exits)
+	grid.build_time = time.perf_counter() - build_start
+	return grid, start_cell, finish_cell
+
+# JUNCTION GRAPH
+class JunctionGraph():
+	# corridor-compressed maze -- nodes are the dead ends and junctions (every cell without exactly two openings),
+	# plus any extra cell indices such as the exits, and edges are the corridors between them
+	# nodes[n] - cell index of node n
+	# node_of[i] - node of cell index i, or -1 inside a corridor
+	# edges[n] - (other node, length in steps, first move) for every corridor leaving node n
+	def __init__(self, grid, extra=()):
+		self.cols = grid.cols
+		self.cells = grid.cells
+		self.moves = grid.moves()
+		self.node_of = array("i", [-1]) * len(grid.cells)
+		self.nodes = array("i", [match.start() for match in re.finditer(b"\x01", grid.cells.translate(NODE_BYTES))])
+		for n, i in enumerate(self.nodes):
+			self.node_of[i] = n
+		for i in extra: # corridor cells that must be nodes
+			if self.node_of[i] < 0:
+				self.node_of[i] = len(self.nodes)
+				self.nodes.append(i)
+		# follow every corridor from both of its ends -- each cell is walked at most twice
+		self.edges = []
+		for i in self.nodes:
+			node_edges = []
+			for step in self.moves[self.cells[i]]:
+				end, length = self.follow(i, step)
+				node_edges.append((self.node_of[end], length, step))
+			self.edges.append(node_edges)
+
+	def follow(self, i, step):
+		# walk from cell index i through its open side (step) to the next node -- returns (node cell, steps taken)
+		cells = self.cells
+		moves = self.moves
+		node_of = self.node_of
+		prev = i
+		i += step
+		length = 1
+		while node_of[i] < 0:
+			for k in moves[cells[i]]: # a corridor cell has two openings -- take the one not walked in through
+				if i + k != prev:
+					prev = i
+					i += k
+					break
+			length += 1
+		return i, length
+
+	def run(self, i, step):
+		# cell index reached by leaving cell index i through its open side (step) and running to the next node
+		n = self.node_of[i]
+		if n >= 0:
+			for other, _, first in self.edges[n]:
+				if first == step:
+					return self.nodes[other]
+		return self.follow(i, step)[0] # from inside a corridor
+
+	def corridor(self, i, step):
+		# cell indices from node cell i (excluded) along one corridor, up to and including the node at its end
+		cells = self.cells
+		moves = self.moves
+		node_of = self.node_of
+		prev = i
+		i += step
+		path = [i]
+		while node_of[i] < 0:
+			for k in moves[cells[i]]:
+				if i + k != prev:
+					prev = i
+					i += k
+					break
+			path.append(i)
+		return path
+
+	def path(self, start, finish):
+		# path between two node cells as an array of cell indices -- the search only visits nodes
+		source = self.node_of[start]
+		target = self.node_of[finish]
+		parent = array("i", [-1]) * len(self.nodes) # previous node
+		parent_step = array("i", [0]) * len(self.nodes) # move that leaves the previous node
+		parent[source] = source
+		queue = array("i", [source])
+		for n in queue: # grows while it is read
+			if n == target:
+				break
+			for other, _, step in self.edges[n]:
+				if parent[other] < 0:
+					parent[other] = n
+					parent_step[other] = step
+					queue.append(other)
+		if parent[target] < 0:
+			return None
+		legs = [] # corridors from the finish back to the start
+		n = target
+		while n != source:
+			legs.append((self.nodes[parent[n]], parent_step[n]))
+			n = parent[n]
+		path = array("i", [start])
+		for i, step in reversed(legs):
+			path.extend(self.corridor(i, step))
+		return path
+
+# SOLVER
+# every solver returns the path from start to finish as an array of flat cell indices (row * cols + col),
+# or None when the finish cannot be reached
+def solve_bfs(grid, start, finish):
+	# walk down the distance field of the finish -- the field is cached on the grid, so solving again is O(path)
+	dist = grid.distance_field(finish)
+	if dist[start] < 0:
+		return None
+	cells = grid.cells
+	moves = grid.moves()
+	path = array("i", [start])
+	i = start
+	while i != finish:
+		d = dist[i] - 1
+		for k in moves[cells[i]]:
+			if dist[i+k] == d: # one step closer
+				i += k
+				break
+		path.append(i)
+	return path
+
+def solve_astar(grid, start, finish):
+	# A* with the manhattan distance to the finish as the heuristic
+	cells = grid.cells
+	cols = grid.cols
+	moves = grid.moves()
+	finish_row, finish_col = divmod(finish, cols)
+	steps = array("i", [-1]) * len(cells) # best known steps from the start
+	parent = array("i", [-1]) * len(cells)
+	steps[start] = 0
+	heap = [(0, start)]
+	while heap:
+		_, i = heapq.heappop(heap)
+		if i == finish:
+			return trace_path(parent, start, finish)
+		d = steps[i] + 1
+		for k in moves[cells[i]]:
+			k += i
+			if steps[k] < 0 or d < steps[k]:
+				steps[k] = d
+				parent[k] = i
+				row, col = divmod(k, cols)
+				heapq.heappush(heap, (d + abs(row - finish_row) + abs(col - finish_col), k))
+	return None
+
+def solve_bidirectional(grid, start, finish):
+	# breadth first from both ends, one level of the smaller frontier at a time, until the searches meet
+	# one parent array and one byte per cell for which search got there first (1 start, 2 finish) --
+	# a single lookup per neighbour tells unvisited, own side and meeting apart
+	if start == finish:
+		return array("i", [start])
+	cells = grid.cells
+	moves = grid.moves()
+	parent = array("i", [-1]) * len(cells)
+	side_of = bytearray(len(cells))
+	parent[start] = start
+	parent[finish] = finish
+	side_of[start] = 1
+	side_of[finish] = 2
+	frontiers = [None, [start], [finish]]
+	meet = None # (last cell of the start search, first cell of the finish search)
+	while meet == None and frontiers[1] and frontiers[2]:
+		side = 1 if len(frontiers[1]) <= len(frontiers[2]) else 2
+		frontier = []
+		append = frontier.append
+		for i in frontiers[side]:
+			for k in moves[cells[i]]:
+				k += i
+				owner = side_of[k]
+				if not owner:
+					side_of[k] = side
+					parent[k] = i
+					append(k)
+				elif owner != side: # reached by the other search
+					meet = (i, k) if side == 1 else (k, i)
+					break
+			if meet:
+				break
+		frontiers[side] = frontier
+	if meet == None:
+		return None
+	path = trace_path(parent, start, meet[0])
+	i = meet[1]
+	path.append(i)
+	while i != finish: # the rest of the way back along the finish search
+		i = parent[i]
+		path.append(i)
+	return path
+
+def solve_junctions(grid, start, finish):
+	# breadth first over the junction graph (cached on the grid) -- only the corridors on the path are walked
+	return grid.junction_graph((start, finish)).path(start, finish)
+
+def trace_path(parent, start, end):
+	# path from start to end, following parent links back from the end
+	path = array("i", [end])
+	while end != start:
+		end = parent[end]
+		path.append(end)
+	path.reverse()
+	return path
+
+# solver -- key: (menu name, function)
+SOLVERS = {
+	"bfs": ("Breadth-First", solve_bfs),
+	"astar": ("A*", solve_astar),
+	"bidirectional": ("Bidirectional", solve_bidirectional),
+	"junctions": ("Junction Graph", solve_junctions),
+}
+
+def solve(grid, start_cell, finish_cell, method="bidirectional"):
+	# path between two cells [row,col] (see SOLVER)
+	start = start_cell[0] * grid.cols + start_cell[1]
+	finish = finish_cell[0] * grid.cols + finish_cell[1]
+	return SOLVERS[method][1](grid, start, finish)
+
+# METRICS
+# difficulty statistics of a maze -- the cell counts are whole-grid bytes.translate / count passes (no python loop
+# over cells), the solution length is one bidirectional search (none if the distance field is already cached)
+METRIC_FIELDS = ["dead_ends", "junctions", "branching", "solution_length", "river", "tortuosity"]
+
+def maze_metrics(grid, start_cell, finish_cell):
+	# dead_ends - cells with 3 walls
+	# junctions - cells with 3 or 4 openings
+	# branching - new directions offered at a junction, on average
+	# solution_length - steps from start to finish
+	# river - cells off the solution per dead end -- high for a few long rivers, low for many short dead ends
+	# tortuosity - solution length over the manhattan distance between the exits
+	borders = grid.cells.translate(BORDER_BYTES)
+	dead_ends = borders.count(3)
+	three_way = borders.count(1)
+	four_way = borders.count(0)
+	junctions = three_way + four_way
+	start = start_cell[0] * grid.cols + start_cell[1]
+	finish = finish_cell[0] * grid.cols + finish_cell[1]
+	if grid.distance_target == finish: # longest path exits
+		solution_length = grid.distances[start]
+	else:
+		solution_length = len(solve_bidirectional(grid, start, finish)) - 1
+	side_dead_ends = dead_ends - (borders[start] == 3) - (borders[finish] == 3) # the exits are not side branches
+	off_path = len(borders) - (solution_length + 1)
+	distance = abs(start_cell[0] - finish_cell[0]) + abs(start_cell[1] - finish_cell[1])
+	return {
+		"dead_ends": dead_ends,
+		"junctions": junctions,
+		"branching": round((2 * three_way + 3 * four_way) / junctions, 4) if junctions else 0,
+		"solution_length": solution_length,
+		"river": round(off_path / side_dead_ends, 4) if side_dead_ends > 0 else 0,
+		"tortuosity": round(solution_length / distance, 4) if distance else 0,
+	}
+
+class MetricsReport():
+	# streams metric rows to a .csv or .jsonl file (by extension) -- every row is flushed as soon as it is written
+	def __init__(self, filepath, fields):
+		self.fields = fields
+		self.file = open(filepath, "w", newline="")
+		self.csv = None
+		if not filepath.endswith(".jsonl"):
+			self.csv = csv.DictWriter(self.file, fields)
+			self.csv.writeheader()
+
+	def write_row(self, row):
+		if self.csv:
+			self.csv.writerow(row)
+		else:
+			self.file.write(json.dumps({field: row[field] for field in self.fields}) + "\n")
+		self.file.flush()
+
+	def close(self):
+		self.file.close()
+
+# BACKGROUND GENERATION
+class MazeQueue():
+	# keeps a few finished mazes ready on a worker thread, so a new maze can be swapped in without a stall
+	# mazes are built for one target (rows, cols, engine, seed, exits) -- changing the target throws the old ones away
+	SIZE = 2 # mazes kept ready
+	def __init__(self, size=SIZE):
+		self.size = size
+		self.target = None
+		self.version = 0 # bumped on every new target, so results from an old target are dropped
+		self.ready = deque()
+		self.condition = threading.Condition()
+		self.worker = threading.Thread(target=self.run, name="maze queue", daemon=True)
+		self.worker.start()
+
+	def set_target(self, target):
+		# target - (rows, cols, engine, seed, exits)
+		with self.condition:
+			if target != self.target:
+				self.target = target
+				self.version += 1
+				self.ready.clear() # invalidate
+				self.condition.notify()
+
+	def pop(self, target):
+		# next ready maze (grid, start, finish) for this target, or None if one is not finished yet
+		with self.condition:
+			self.set_target(target)
+			item = self.ready.popleft() if self.ready else None
+			self.condition.notify() # refill
+			return item
+
+	def run(self):
+		while True:
+			with self.condition:
+				while self.target == None or len(self.ready) >= self.size:
+					self.condition.wait()
+				target = self.target
+				version = self.version
+			item = build_maze(*target) # outside the lock
+			with self.condition:
+				if version == self.version: # still wanted
+					self.ready.append(item)
+
+def adaptive_line_size(screen_tiles):
+	# an appropriate line size based on visible tiles
+	line_size = 0
+	if screen_tiles <= 3:
+		line_size = 15
+	elif screen_tiles <= 5:
+		line_size = 9
+	elif screen_tiles <= 7:
+		line_size = 5
+	elif screen_tiles <= 10:
+		line_size = 3
+	elif screen_tiles <= 15:
+		line_size = 2
+	else:
+		line_size = 1
+	return line_size
 
 class Maze():
 	## Maze specific constants
 	# lengths will be relative to smallest side
 	RATIO = 8/9 # (%) size of maze window relative to its full size
 	MIN_TILES = 3 # cannot have a dimension smaller than this
-	MAX_TILES = 50
+	MAX_TILES = 100 # configurable -- generation is no longer bound by the recursion limit
 
 	MIN_FRAME_SIZE = 3 # frame must show at least this many tiles per side
 	MAX_FRAME_SIZE = 50 # frame cannot become larger than this (on screen)
@@ -136,18 +1237,24 @@ class Maze():
 	EXPAND_VAL = 1 # increment groups
 	EXPAND_SPEED = 45 # line ticks / sec
 
-	# largest possible maze generation
-	if sys.getrecursionlimit() < (MAX_TILES ** 2):
-		sys.setrecursionlimit(MAX_TILES ** 2)
+	WALL_LAYER_MAX_PIXELS = 8000000 # larger wall layers are not cached, the visible cells are drawn every frame instead
+	ZOOM_SETTLE = 0.2 # (sec) after the last zoom step the walls are drawn crisp again, until then they are scaled from the zoom pyramid
+
+	# generation engine -- key of ENGINES, or "dfs_recursive" for generate()
+	DEFAULT_ENGINE = "dfs" # explicit stack, any size
+	RECURSIVE_MAX_TILES = 50 # largest side the recursive engine is trusted with (C stack)
+	DEFAULT_EXITS = "corners" # key of EXIT_MODES
+	DEFAULT_SOLVER = "bidirectional" # key of SOLVERS -- searches only until both ends meet, no full distance field
 
 	# colors
 	C_BACKGROUND = PEACH_2
 	C_BACKGROUND = PEACH
 	C_EXITS = PEACH_2
 	C_GRID = BLACK
+	C_SOLUTION = RED
 	
 	def __init__(self, dim, fps):
-		self.data = [] # array of blocks
+		self.data = None # Grid of wall bits
 		# --- window ---
 		self.surface = None
 		self.win_pos = (0,0) # (x,y)
@@ -160,11 +1267,21 @@ class Maze():
 		self.tilesize = 0 # tiles are always squares
 		self.start_cell = None
 		self.finish_cell = None
+		self.engine = Maze.DEFAULT_ENGINE
+		self.exits = Maze.DEFAULT_EXITS
+		self.solver = Maze.DEFAULT_SOLVER
+		self.solution = None # path from start to finish (array of cell indices), found when first needed
+		self.on_path = None # 1 byte per cell -- marks the cells of the solution
+		self.show_solution = False
+		self.queue = None # MazeQueue of ready-made mazes (optional)
+		self.wall_layer = None # every wall drawn once at the current tile size, see get_wall_layer()
+		self.wall_layer_key = None # (tilesize, line width, line color) it was drawn with -- None after a new maze
 		# --- frame ---
 		self.frame_pos = [0,0] # fov [y,x] - cell at topleft of frame
 		self.frame_size = (0,0) # (rows, cols)
 		self.min_frame_length = Maze.MIN_FRAME_SIZE # number of tiles at largest possible zoom
 		self.max_frame_length = Maze.MAX_FRAME_SIZE # number of tiles at smallest zoom (may not be able to show full maze)
+		self.last_view = None # (what was drawn, pixel offset) of the last static frame, see scroll_view() -- None after a new maze
 		# --- scroll ---
 		self.scroll_delay = int(self.fps / Maze.SCROLL_SPEED * Maze.SCROLL_VAL) # frames / scroll
 		self.scroll_counter = 0
@@ -173,6 +1290,12 @@ class Maze():
 		self.zoom_delay = int(0.25 * self.fps)
 		self.cont_zoom = False
 		self.zoom_counter = 0
+		self.zoom_settle = int(Maze.ZOOM_SETTLE * self.fps) # frames
+		self.settle_counter = 0 # frames until the zoom settles
+		self.lod_levels = {} # zoom pyramid -- wall layers keyed by (power of two tile size, line width), see get_lod_level()
+		self.lod_color = None # line color of the pyramid
+		self.lod_pending = False # levels around the current tile size may be missing, see prebuild_lod()
+		self.lod_shown = None # tile size of the level the walls were last scaled from, None when drawn crisp
 		# --- lines ---
 		self.expand_interval = int(self.fps / Maze.EXPAND_SPEED * Maze.EXPAND_VAL)
 		self.expand_delay = int(0.25 * self.fps)
@@ -189,24 +1312,71 @@ class Maze():
 		self.resize(dim) # set maze and tile dimensions, fill with blank tiles
 		self.update_line_size()
 
-	def remap(self, seed=(0,0)):
+	@traced("remap")
+	def remap(self, seed=(0,0), engine=None):
 		# make a new maze out of this one
+		if engine == None:
+			engine = self.engine
+		build_start = time.perf_counter()
+		self.reset()
+		with trace_span("generate", engine=engine, rows=self.rows, cols=self.cols):
+			if engine == "dfs_recursive" and max(self.rows, self.cols) <= Maze.RECURSIVE_MAX_TILES:
+				# one frame per cell -- only raise the limit as far as this maze needs
+				if sys.getrecursionlimit() < (self.rows * self.cols + 100):
+					sys.setrecursionlimit(self.rows * self.cols + 100)
+				self.generate(seed)
+			else:
+				if engine not in ENGINES: # includes recursive dfs on mazes too large to recurse safely
+					engine = "dfs"
+				ENGINES[engine][1](self.data, seed)
+		if DEBUG: #!
+			error = self.data.validate()
+			if error:
+				print('Error remap() - ' + error)
+		self.find_exits()
+		self.data.build_time = time.perf_counter() - build_start
+		self.set_frame_center(self.start_cell)
+
+	def load(self, grid, start_cell, finish_cell):
+		# swap in a finished maze of the same size
+		self.data = grid
+		self.start_cell = start_cell
+		self.finish_cell = finish_cell
+		self.solution = None
+		self.wall_layer_key = None # new walls
+		self.lod_levels = {}
+		self.last_view = None
+		self.set_frame_center(self.start_cell)
+
+	def renew(self, seed=(0,0)):
+		# new maze -- taken from the background queue when one is ready, otherwise generated now
+		item = None
+		if self.queue:
+			item = self.queue.pop((self.rows, self.cols, self.engine, tuple(seed), self.exits))
+		if item:
+			self.load(*item)
+		else:
+			self.remap(seed)
+
+	def load_walls(self, codes):
+		# use ready-made wall codes (rows * cols bytes, e.g. one maze of a batch) as this maze
 		self.reset()
-		self.generate(seed)
+		self.data.cells[:] = bytes(codes)
 		self.find_exits()
 		self.set_frame_center(self.start_cell)
 
 	def reset(self):
-		# grid of blocks (no paths)
+		# grid of blocked cells (no paths)
 		self.start_cell = None
 		self.finish_cell = None
-		self.data = []
-		for y in range(self.rows):
-			row = []
-			for x in range(self.cols):
-				block = Block(y, x)
-				row.append(block)
-			self.data.append(row)
+		self.solution = None
+		self.wall_layer_key = None
+		self.lod_levels = {}
+		self.last_view = None
+		if self.data and self.data.rows == self.rows and self.data.cols == self.cols:
+			self.data.reset() # same size -- refill the existing grid
+		else:
+			self.data = Grid(self.rows, self.cols)
 
 	def resize(self, new_dim=None):
 		# Maze: rows x columns
@@ -311,6 +1481,7 @@ class Maze():
 			self.restrict_zoom()
 			target = self.mouse_cell() # save mouse cell before zoom
 			self.resize() # set new maze dimensions
+			self.settle_counter = self.zoom_settle # scale the walls from the pyramid until zooming stops
 			# anchor the frame closest to where the mouse is
 			self.set_frame_to_cursor(target)
 			self.update_frame_pos() # fix bounds
@@ -351,21 +1522,7 @@ class Maze():
 		# use current maze settings
 		if not screen_tiles:
 			screen_tiles = max(self.frame_size)
-		# calculate an appropriate line size based on visible tiles
-		line_size = 0
-		if screen_tiles <= 3:
-			line_size = 15
-		elif screen_tiles <= 5:
-			line_size = 9
-		elif screen_tiles <= 7:
-			line_size = 5
-		elif screen_tiles <= 10:
-			line_size = 3
-		elif screen_tiles <= 15:
-			line_size = 2
-		else:
-			line_size = 1
-		return line_size
+		return adaptive_line_size(screen_tiles)
 
 	def update_line_size(self):
 		# update line size - should be called when max screen tiles changes (for adaptive size)
@@ -507,23 +1664,18 @@ class Maze():
 			return -2 # same cell
 		elif abs(x) == 1 and abs(y) == 1:
 			return -3 # diagonal cell
-		# Remove the Barrier (relative to pos1 cell)
+		# Remove the Barrier (relative to pos1 cell) -- the grid clears the matching wall of pos2
 		if x == -1: # LEFT
-			self.data[row1][col1].left = 0
-			self.data[row2][col2].right = 0
+			self.data.carve(row1, col1, LEFT)
 		elif x == 1: # RIGHT
-			self.data[row1][col1].right = 0
-			self.data[row2][col2].left = 0
+			self.data.carve(row1, col1, RIGHT)
 		elif y == -1: # TOP
-			self.data[row1][col1].top = 0
-			self.data[row2][col2].bottom = 0
+			self.data.carve(row1, col1, TOP)
 		elif y == 1: # BOTTOM
-			self.data[row1][col1].bottom = 0
-			self.data[row2][col2].top = 0
+			self.data.carve(row1, col1, BOTTOM)
 
-	def find_neighbours(self, cell, blocks):
-		# returns a list of pos of neighbour cells
-		# adds unvisited, reachable neighbours to blocks
+	def find_neighbours(self, cell):
+		# returns a list of pos of unvisited, reachable neighbour cells
 		row = cell[0]
 		col = cell[1]
 		neighbours = [[row,col-1], [row-1,col], [row,col+1], [row+1,col]] # adjacent cells
@@ -535,37 +1687,24 @@ class Maze():
 				neighbours.remove(p)
 			elif y < 0 or y >= self.rows: # row
 				neighbours.remove(p)
-			else:
-				new_block = self.data[y][x] # exists
-				if new_block.visited: # visited
-					neighbours.remove(p)
-				else: # unvisited
-					blocks.append(new_block) # add block
+			elif self.data.visited(y, x): # visited
+				neighbours.remove(p)
 		return neighbours
 
 	def check_visited(self):
-		total = 0
-		for row in range(len(self.data)):
-			for col in range(len(self.data[row])):
-				block = self.data[row][col]
-				if block.visited:
-					total += 1
-		return total
+		return self.data.cells.translate(VISITED_BYTES).count(1)
 
 	def generate(self, cell):
 		# index of cell - [row, col]
 		row = cell[0]
 		col = cell[1]
-		curr_block = self.data[row][col]
-		curr_block.visited = 1
+		self.data.set_visited(row, col)
 
-		unvisited_blocks = [] # cells that can be visited
-		neighbours = self.find_neighbours(cell, unvisited_blocks) # positions of unvisited cells
+		neighbours = self.find_neighbours(cell) # positions of unvisited cells
 
 		while neighbours:
 			# choose random cell to advance to
 			i = random.randint(1, len(neighbours)) - 1
-			next_block = unvisited_blocks[i]
 			# remove the barrier
 			pos2 = [neighbours[i][0], neighbours[i][1]]
 			err = self.unblock(cell, pos2)
@@ -579,180 +1718,24 @@ class Maze():
 			# recurse with the new cell
 			self.generate(pos2)
 			# update visited neighbours when returned back to this cell
-			unvisited_blocks = []
-			neighbours = self.find_neighbours(cell, unvisited_blocks)
-			if len(unvisited_blocks) != len(neighbours):
-				print('Error generate() - # of neighbours does not match unvisited blocks')
-				break
+			neighbours = self.find_neighbours(cell)
 		else:
 			# retreat back to an old cell
 			return
 
-	def find_cell(self, cell, n, radius=0, cw=1, dir=[]): # closest block from the cell that has n borders
-		if DEBUG:
-			print('Find a cell with (%d) borders from [%d,%d] - r=%d' % (n, cell[0], cell[1], radius)) #!
-		# chosen cell
-		center_row = cell[0]
-		center_col = cell[1]
-		# Ring
-		# define bounds
-		top = center_row - radius
-		bottom = center_row + radius
-		left = center_col - radius
-		right = center_col + radius
-		# choose starting cell -- dir [x,y]
-		if not dir:
-			dir = [-1,-1] # default
-		# ROW
-		if dir[1] == 0:
-			y = center_row
-		elif dir[1] == 1:
-			y = bottom
-		else: # default
-			y = top
-		# COL
-		if dir[0] == 0:
-			x = center_col
-		elif dir[0] == 1:
-			x = right
-		else: # default
-			x = left
-		# chose center
-		if y == x:
-			y = top # override
-
-		# Initialize starting point
-		pos = [y,x]
-		start_pos = None
-		set_start = False
-
-		# Set initial direction
-		# increments row or column
-		if dir[0] == 0: # col=0
-			i = 1 # inc. col
-		elif dir[1] == 0: # row=0
-			i = 0 # inc. row
-		elif dir[0] == dir[1]: # top-left, bottom-right
-			if cw == 1:
-				i = 1 # inc. col
-			else: # ccw
-				i = 0 # inc. row
-		else: # bottom-left, top-right
-			if cw == 1:
-				i = 1 # inc. row
-			else: # ccw
-				i = 0 # inc. col
-
-		# Search in the ring
-		# ===================
-		while True:
-			# Check cell exists on map
-			for _ in range (2):
-				if pos[0] < 0: # ABOVE map
-					pos[0] = 0 # row=top
-					# col is left/right
-					if cw == 1:
-						pos[1] = right
-					else:
-						pos[1] = left
-					i = 0 # move vertically
-				elif pos[0] >= self.rows: # BELOW map:
-					pos[0] = self.rows-1 # row=bottom
-					# col is left/right
-					if cw == 1:
-						pos[1] = left
-					else:
-						pos[1] = right
-					i = 0 # move vertically
-				elif pos[1] < 0: # LEFT of map
-					pos[1] = 0 # col=left
-					# row is top/bottom
-					if cw == 1:
-						pos[0] = top
-					else:
-						pos[0] = bottom
-					i = 1 # move horizontally
-				elif pos[1] >= self.cols: # RIGHT of map
-					pos[1] = self.cols-1 # col=right
-					# row is top/bottom
-					if cw == 1:
-						pos[0] = bottom
-					else:
-						pos[0] = top
-					i = 1 # move horizontally
-
-			# Define start pos
-			if not set_start:
-				start_pos = pos.copy() # COPY (not linked to the current position)
-				set_start = True
-				if DEBUG:
-					print(pos) #! start pos
-					print('*****')
-			# Check if completed ring
-			else:
-				if pos == start_pos: # completed loop
-					if DEBUG:
-						print('Finished cycle %d\n' % radius) #!
-					break
-				if DEBUG:
-					print(pos) #! current pos
-					print('-----') 
-
-			# Inspect cell
-			block = self.data[pos[0]][pos[1]]
-			if block.borders() == n:
-				if DEBUG:
-					print('Found Cell!\n') #!
-				return block # FOUND CELL
-
-			# Move to the next cell
-			if left == right: # 0 radius case
-				continue
-			if i == 0: # moving vertically
-				if pos[1] == right: # positive
-					pos[i] += cw
-				elif pos[1] == left: # reversed
-					pos[i] -= cw
-				else:
-					print('Error find_cell() - moving vertically [wrong column]')
-			elif i == 1: # moving horizontally
-				if pos[0] == top: # positive
-					pos[i] += cw
-				elif pos[0] == bottom: # reversed
-					pos[i] -= cw
-				else:
-					print('Error find_cell() - moving horizontally [wrong row]')
-			else:
-				print('Error find_cell - index not defined')
-			# Update direction (at corners)
-			if pos in [[top,left], [top,right], [bottom,left], [bottom,right]]: # corner
-				i = abs(i-1) # flip col/row
-
-		# Could not find a match in the ring!
-		if radius >= (max(self.rows,self.cols)-1): # could not find any matching cell
-			print('Error find_cell() - no cell has %d borders!' % n)
-			return -1
-		else:
-			return self.find_cell(cell, n, radius=(radius+1), cw=cw, dir=dir) # SEARCH AGAIN, +1 radius
-
 	def check_valid(self):
-		valid = True
-		for row in range(len(self.data)):
-			for col in range(len(self.data[row])):
-				if self.data[row][col].borders() == 4:
-					valid = False
-					break
-		return valid
+		# a perfect maze -- see Grid.validate()
+		return self.data.validate() == None
 
 	def check_cell(self, cell):
-		block = self.data[cell[0]][cell[1]]
-		print('Left: ' + str(block.left))
-		print('Right: ' + str(block.right))
-		print('Top: ' + str(block.top))
-		print('Bottom: ' + str(block.bottom))
+		walls = self.data.walls(cell[0], cell[1])
+		print('Left: ' + str(int(bool(walls & LEFT))))
+		print('Right: ' + str(int(bool(walls & RIGHT))))
+		print('Top: ' + str(int(bool(walls & TOP))))
+		print('Bottom: ' + str(int(bool(walls & BOTTOM))))
 		print()
 
-	def draw_borders(self):
+	def frame_bounds(self):
 		upper_bounds = [0,0] # [first_row, first_col] -- top and left
 		lower_bounds = [0,0] # [last_row, last_col] -- bottom and right
 		# set bounds -- frame_size[i] rows/cols fit on window except when half of a row/col is drawn, then frame_size[i]+1 rows/cols are on screen (two 'half' tiles on either end)
@@ -761,20 +1744,186 @@ class Maze():
 		for i in range(2):
 			# frame_size is a constant
 			lower_bounds[i] += math.ceil(self.frame_pos[i] + self.frame_size[i]) # round up so the 'half' tile is drawn at one of the lower bounds
+		return upper_bounds, lower_bounds
+
+	def clip_bounds(self):
+		# frame_bounds() narrowed to the cells under the surface's clip rect, plus the cells around it
+		# whose walls and solution lines reach into it
+		upper_bounds, lower_bounds = self.frame_bounds()
+		clip = self.surface.get_clip()
+		for i, (first, last) in enumerate(((clip.top, clip.bottom), (clip.left, clip.right))):
+			upper_bounds[i] = max(int(self.frame_pos[i] + first / self.tilesize), upper_bounds[i]) - 1
+			lower_bounds[i] = min(math.ceil(self.frame_pos[i] + last / self.tilesize), lower_bounds[i]) + 1
+			# within the maze
+			upper_bounds[i] = max(upper_bounds[i], 0)
+			lower_bounds[i] = min(lower_bounds[i], (self.rows, self.cols)[i])
+		return upper_bounds, lower_bounds
+
+	def tick(self):
+		# once a frame, whether or not anything is drawn -- counts down the zoom settle,
+		# and while not zooming builds the zoom pyramid around a wall layer drawn on an earlier frame
+		if self.settle_counter > 0:
+			self.settle_counter -= 1
+			if self.settle_counter == 0:
+				self.last_view = None # zooming stopped -- redraw the walls crisp
+		elif self.lod_pending and self.wall_layer and self.wall_layer_key == (self.tilesize, self.line_width, tuple(self.line_color)):
+			self.prebuild_lod()
+
+	def scroll_view(self, static):
+		# clip rects to draw this frame in -- [None] for the whole surface
+		# a static frame (nothing on it but the maze) that only moved since the last one is shifted with Surface.scroll(),
+		# so only the strips it uncovered are drawn -- scrolling costs the cells it brings into view, not the whole view
+		offset = (-self.frame_pos[1] * self.tilesize, -self.frame_pos[0] * self.tilesize)
+		view = (self.surface, self.tilesize, self.line_width, tuple(self.line_color), tuple(self.bg_color), tuple(self.exit_color),
+			self.show_solution, tuple(self.start_cell), tuple(self.finish_cell), self.settle_counter > 0)
+		last = self.last_view
+		self.last_view = (view, offset) if static else None
+		# whole pixels only -- shapes at fractional positions round differently once moved
+		if not static or not last or last[0] != view or offset != (int(offset[0]), int(offset[1])) or last[1] != (int(last[1][0]), int(last[1][1])):
+			return [None]
+		dx = int(offset[0] - last[1][0])
+		dy = int(offset[1] - last[1][1])
+		width, height = self.surface.get_size()
+		if abs(dx) >= width or abs(dy) >= height:
+			return [None]
+		self.surface.scroll(dx, dy)
+		clips = []
+		if dx:
+			clips.append(pygame.Rect(0 if dx > 0 else width + dx, 0, abs(dx), height))
+		if dy: # the corner shared with a vertical strip is drawn once
+			left = dx if dx > 0 else 0
+			clips.append(pygame.Rect(left, 0 if dy > 0 else height + dy, width - abs(dx), abs(dy)))
+		return clips
+
+	def visible_walls(self):
+		# number of wall tiles draw_borders() blits without the cached layer (cells with any wall in view) -- only counted when asked for
+		upper_bounds, lower_bounds = self.frame_bounds()
+		cells = self.data.cells
+		total = 0
+		for row in range(upper_bounds[0], lower_bounds[0]):
+			start = row * self.cols
+			total += (lower_bounds[1] - upper_bounds[1]) - cells[start + upper_bounds[1]:start + lower_bounds[1]].translate(BORDER_BYTES).count(0)
+		return total
 
-		# Draw All
-		for row in range(upper_bounds[0], lower_bounds[0]): # remember loop does not count last index (so -1 is not added)
-			for col in range(upper_bounds[1], lower_bounds[1]):
-				new_block = self.data[row][col]
-				new_block.drawlines(self.surface, self.line_color, self.tilesize, self.line_width, self.frame_pos)
-		return
+	def render_walls(self, tilesize, line_width, rle=True):
+		# surface with every wall of the maze -- transparent (colorkey) apart from the walls
+		# walls spill past the right and bottom edges by up to a line width
+		# rle makes whole blits faster, but every subsurface() of it decodes the whole surface again
+		transparent = MAGENTA if tuple(self.line_color) != MAGENTA else GREEN
+		layer = pygame.Surface((self.cols * tilesize + line_width, self.rows * tilesize + line_width))
+		layer.fill(transparent)
+		if can_raster(layer, tilesize, line_width):
+			raster_walls(layer, self.data, self.line_color, tilesize, line_width)
+		else:
+			draw_wall_tiles(layer, self.data, (0,0), (self.rows, self.cols), self.line_color, tilesize, line_width, (0,0))
+		layer.set_colorkey(transparent, pygame.RLEACCEL if rle else 0)
+		return layer
+
+	def layer_fits(self, tilesize, line_width):
+		return (self.cols * tilesize + line_width) * (self.rows * tilesize + line_width) <= Maze.WALL_LAYER_MAX_PIXELS
+
+	def get_wall_layer(self):
+		# surface with the walls of the whole maze, drawn once per maze, tile size, line width and line color
+		# None when it would use too much memory
+		key = (self.tilesize, self.line_width, tuple(self.line_color))
+		if self.wall_layer_key != key:
+			self.wall_layer_key = key
+			self.wall_layer = None
+			if self.layer_fits(self.tilesize, self.line_width):
+				with trace_span("wall_layer", rows=self.rows, cols=self.cols, tilesize=self.tilesize):
+					self.wall_layer = self.render_walls(self.tilesize, self.line_width)
+				self.lod_pending = True # new maze, zoom, line width or color -- the pyramid around it is built while idle
+		return self.wall_layer
+
+	def lod_line_width(self, level):
+		# line width of a pyramid level -- the current width, so it looks the same once scaled to the current tile size
+		return max(1, round(self.line_width * level / max(self.tilesize, 1)))
+
+	def lod_fit(self, level):
+		# the pyramid level, or the largest one below it that fits in memory -- None if none do
+		while level > 1 and not self.layer_fits(level, self.lod_line_width(level)):
+			level //= 2
+		if not self.layer_fits(level, self.lod_line_width(level)):
+			return None
+		return level
+
+	def lod_key(self, level):
+		# (level, line width) of a pyramid level, the level drawn if it is missing -- a level drawn with another line
+		# width is replaced, so changing the line width never shows stale walls
+		if self.lod_color != tuple(self.line_color):
+			self.lod_color = tuple(self.line_color)
+			self.lod_levels = {}
+		key = (level, self.lod_line_width(level))
+		if key not in self.lod_levels:
+			for old in [old for old in self.lod_levels if old[0] == level]:
+				del self.lod_levels[old]
+			with trace_span("lod_level", rows=self.rows, cols=self.cols, tilesize=level):
+				self.lod_levels[key] = self.render_walls(level, key[1], False) # only ever scaled in parts
+		return key
+
+	def get_lod_level(self):
+		# (tile size, wall layer) of the zoom pyramid to scale the current tile size from -- None if no level fits in memory
+		# the next power of two up (scaling down keeps thin lines), or the largest that fits
+		# each level is drawn once per maze, line width and line color, so zooming across it never redraws the walls
+		level = self.lod_fit(1 << math.ceil(math.log2(max(self.tilesize, 1))))
+		if not level:
+			return None
+		key = self.lod_key(level)
+		return level, self.lod_levels[key]
+
+	def prebuild_lod(self):
+		# draw one missing pyramid level around the current tile size -- the one zooming starts from and the ones
+		# above and below it -- so the first zoom after a new maze (or line width) scales instead of drawing walls
+		# called by tick() on frames that are not zooming, one level per frame
+		level = 1 << math.ceil(math.log2(max(self.tilesize, 1)))
+		for level in (level, level * 2, max(1, level // 2)):
+			level = self.lod_fit(level)
+			if level and (level, self.lod_line_width(level)) not in self.lod_levels:
+				self.lod_key(level)
+				return
+		self.lod_pending = False
+
+	def draw_lod(self):
+		# walls scaled from the zoom pyramid -- only the part in view is scaled
+		lod = self.get_lod_level()
+		if not lod:
+			return False
+		level, layer = lod
+		scale = self.tilesize / level
+		# view in level pixels, one extra pixel for the partial tiles
+		left = math.floor(self.frame_pos[1] * level)
+		top = math.floor(self.frame_pos[0] * level)
+		width = min(math.ceil(self.surface.get_width() / scale) + 1, layer.get_width() - left)
+		height = min(math.ceil(self.surface.get_height() / scale) + 1, layer.get_height() - top)
+		if width <= 0 or height <= 0:
+			return False
+		view = pygame.transform.scale(layer.subsurface((left, top, width, height)), (round(width * scale), round(height * scale)))
+		self.surface.blit(view, (math.floor((left - self.frame_pos[1] * level) * scale), math.floor((top - self.frame_pos[0] * level) * scale)))
+		self.lod_shown = level
+		return True
+
+	def draw_borders(self):
+		# while zooming, walls scaled from the zoom pyramid instead of drawing a new wall layer every step
+		# (without a layer only the cells in view are drawn, which needs no stand-in)
+		if self.settle_counter > 0:
+			if self.wall_layer_key != (self.tilesize, self.line_width, tuple(self.line_color)) and self.layer_fits(self.tilesize, self.line_width) and self.draw_lod():
+				return
+		self.lod_shown = None
+		# one blit of the cached wall layer, shifted to the frame position
+		layer = self.get_wall_layer()
+		if layer:
+			self.surface.blit(layer, (math.floor(-self.frame_pos[1] * self.tilesize), math.floor(-self.frame_pos[0] * self.tilesize)))
+			return
+		# too large to cache -- draw the walls of the visible cells
+		upper_bounds, lower_bounds = self.clip_bounds()
+		draw_wall_tiles(self.surface, self.data, upper_bounds, lower_bounds, self.line_color, self.tilesize, self.line_width, self.frame_pos)
 
 	def draw_star(self, cell, color, size=100, points=5, incline=0.55, start_angle=(math.pi/2)):
 		# draw a star at cell [y,x]
 		if size < 0 or size > 100:
 			size = 100
 		# pos relative to frame
-		pos = [point - frame for (point,frame) in zip(self.data[cell[0]][cell[1]].pos, self.frame_pos)]
+		pos = [point - frame for (point,frame) in zip(cell, self.frame_pos)]
 		for i in range(2): # check if in frame
 			if pos[i]+1 <= 0 or pos[i] >= self.frame_size[i]:
 				return 1 # cannot draw to this cell
@@ -853,12 +2002,59 @@ class Maze():
 			self.surface.blit(design, design_rect)
 		return 0
 
+	@traced("find_exits")
 	def find_exits(self):
 		# Choose start and finish zones
-		start_seed = [self.rows-1, 0] # bottom left
-		finish_seed = [0, self.cols-1] # top right
-		self.start_cell = self.find_cell(start_seed, 3).pos
-		self.finish_cell = self.find_cell(finish_seed, 3, cw=-1).pos
+		self.start_cell, self.finish_cell = self.data.find_exits(self.exits)
+		self.solution = None # new exits, new path
+
+	def get_solution(self):
+		# path from start to finish -- solved once per maze
+		if self.solution == None:
+			solver = self.solver
+			if self.data.distance_target == self.finish_cell[0] * self.cols + self.finish_cell[1]:
+				solver = "bfs" # the field is already there (longest path exits) -- walking it is O(path)
+			self.solution = solve(self.data, self.start_cell, self.finish_cell, solver)
+			self.on_path = bytearray(self.rows * self.cols)
+			for i in self.solution or ():
+				self.on_path[i] = 1
+		return self.solution
+
+	def get_junctions(self):
+		# junction graph of this maze, with the exits as nodes
+		exits = (self.start_cell[0] * self.cols + self.start_cell[1], self.finish_cell[0] * self.cols + self.finish_cell[1])
+		return self.data.junction_graph(exits)
+
+	def toggle_solution(self):
+		if self.show_solution:
+			self.show_solution = False
+		else:
+			self.show_solution = True
+
+	def draw_solution(self):
+		# path through the cells in frame -- a line between every pair of neighbouring path cells
+		if not self.get_solution():
+			return
+		on_path = self.on_path
+		width = max(1, int(self.tilesize / 5))
+		side = (width - 1) // 2 # of the line, above / left of its center
+		half = self.tilesize / 2
+		top, left = self.frame_pos
+		# same bounds as draw_borders
+		(first_row, first_col), (last_row, last_col) = self.clip_bounds()
+		for row in range(first_row, last_row):
+			for col in range(first_col, last_col):
+				i = row * self.cols + col
+				if not on_path[i]:
+					continue
+				# the pixels of a thick pygame.draw.line, as rects -- floored, so they move with the frame and are not cut by the clip
+				x = math.floor((col - left) * self.tilesize + half)
+				y = math.floor((row - top) * self.tilesize + half)
+				# a perfect maze has one path, so open neighbours on it are the next and previous steps
+				if col < self.cols-1 and on_path[i+1] and self.data.is_open(row, col, RIGHT):
+					pygame.draw.rect(self.surface, Maze.C_SOLUTION, (x, y - side, math.floor((col + 1 - left) * self.tilesize + half) - x + 1, width))
+				if row < self.rows-1 and on_path[i+self.cols] and self.data.is_open(row, col, BOTTOM):
+					pygame.draw.rect(self.surface, Maze.C_SOLUTION, (x - side, y, width, math.floor((row + 1 - top) * self.tilesize + half) - y + 1))
 
 	def draw_exits(self):
 		# Draw start / finish
@@ -871,6 +2067,8 @@ class Maze():
 	def draw(self):
 		self.fill()
 		self.draw_exits()
+		if self.show_solution:
+			self.draw_solution()
 		self.draw_borders()
 
 	def draw_board(self, outer_surface, border_size=None, color=None):
@@ -897,39 +2095,8 @@ class Maze():
 		# place
 		outer_surface.blit(board_surface, (board_x, board_y))
 
-	def paint_paper(self, paper, cell, tilesize, color, size=100, symbol=None):
-		# fill size
-		width = tilesize * (size/100) # percent visible
-		height = tilesize * (size/100)
-
-		# fill with color
-		if symbol == None: # square
-			x = cell[1] * tilesize + (tilesize - width) / 2
-			y = cell[0] * tilesize + (tilesize - height) / 2
-			rect = (x, y, width, height)
-			pygame.draw.rect(paper, color, rect)
-		else: # fill with design
-			design = symbol.copy().convert_alpha() # surface
-			# maximally fit design into the tile
-			scale = min(width/design.get_width(), height/design.get_height())
-			design_width = design.get_width() * scale
-			design_height = design.get_height() * scale
-			design = pygame.transform.scale(design, (design_width, design_height))
-			# center the resized design
-			design_x = cell[1] * tilesize + (tilesize - design_width) / 2
-			design_y = cell[0] * tilesize + (tilesize - design_height) / 2
-			design_rect = (design_x, design_y, design_width, design_height)
-			# color the design -- black will be transparent, white will be overridden with color
-			design.set_colorkey(BLACK)
-			design.fill(color, special_flags=pygame.BLEND_MIN) # keeps lower rgb value (fill or previous)
-			# draw design
-			paper.blit(design, design_rect)
-		return
-
-	def to_paper(self, colored, frame_width=None, frame_color=None, p_margin=0, tilesize=50):
-		# tilesize only affects the length of tiles used to render the maze,
-		# the canvas can always be resized.
-		# draw full maze on a new canvas
+	def paper_style(self, colored, frame_width=None, frame_color=None):
+		# colors (line, background, exits, frame), line width and frame width used to put this maze on paper
 		if self.adaptive_lines:
 			line_width = self.get_line_size(max(self.rows, self.cols))
 		else:
@@ -939,65 +2106,28 @@ class Maze():
 			frame_width = int(line_width/2) # on either side
 		if frame_color == None:
 			frame_color = self.line_color
+		colors = (self.line_color, self.bg_color, self.exit_color, frame_color)
+		if not colored: # make black and white
+			colors = (BLACK, WHITE, LIGHT_GREY, BLACK)
+		return colors, line_width, frame_width
 
-		maze_width = (tilesize * self.cols)
-		maze_height = (tilesize * self.rows)
-		maze_pos = (frame_width, frame_width) # on board
-		maze_layer = pygame.Surface((maze_width, maze_height)) # inner surface
-
-		# add one to negative borders to balance frame
-		board_width = maze_width + (frame_width * 2) + 1
-		board_height = maze_height + (frame_width * 2) + 1
-		maze_board = pygame.Surface((board_width, board_height))
-
-		# normal color
-		line_color = self.line_color
-		bg_color = self.bg_color
-		exit_color = self.exit_color
-		margin_color = WHITE
-		# make black and white
-		if not colored:
-			line_color = BLACK
-			frame_color = BLACK
-			bg_color = WHITE
-			exit_color = LIGHT_GREY
-
-		# draw maze
-		maze_layer.fill(bg_color) # background
-
-		# exits
-		self.paint_paper(maze_layer, self.start_cell, tilesize, exit_color)
-		self.paint_paper(maze_layer, self.finish_cell, tilesize, exit_color)
-
-		# lines
-		for row in range(self.rows):
-			for col in range(self.cols):
-				# no frame, since we are drawing the entire maze
-				new_block = self.data[row][col]
-				new_block.drawlines(maze_layer, line_color, tilesize, line_width, (0,0))
-
-		# borders - closed around all edges (no frame)
-		maze_board.fill(frame_color)
-
-		# paste maze to board
-		maze_board.blit(maze_layer, maze_pos)
-		if not p_margin: # no page margins - the board layer is the whole canvas
-			return maze_board
-
-		# get width of margin (for all sides)
-		margin_width = int(min(board_width, board_height) * (p_margin/100) / 2)
-		board_pos = (margin_width, margin_width) # on canvas
-
-		# add page margins
-		canvas_width = board_width + (margin_width * 2)
-		canvas_height = board_height + (margin_width * 2)
-		canvas = pygame.Surface((canvas_width, canvas_height))
-		canvas.fill(margin_color)
-
-		# add maze to canvas
-		canvas.blit(maze_board, board_pos)
-		return canvas
-
+	@traced("to_paper")
+	def to_paper(self, colored, frame_width=None, frame_color=None, p_margin=0, tilesize=50):
+		# tilesize only affects the length of tiles used to render the maze,
+		# the canvas can always be resized.
+		# draw full maze on a new canvas
+		colors, line_width, frame_width = self.paper_style(colored, frame_width, frame_color)
+		solution = self.paper_solution(colored)
+		return render_paper(self.data, self.start_cell, self.finish_cell, colors, line_width, frame_width, p_margin, tilesize, solution)
+
+	def paper_solution(self, colored):
+		# (path, color) to draw on paper while the solution is shown on screen, otherwise None
+		if not self.show_solution or not self.get_solution():
+			return None
+		color = Maze.C_SOLUTION if colored else GREY
+		return (self.solution, color)
+
+	@traced("save_image")
 	def save_image(self, filepath, colored, frame_width=None, frame_color=None, size=None, bound=0):
 		# size - the maximum / minimum length that the image surface may be
 		# bound - 0 = minimum length, 1 = maximum length
@@ -1019,7 +2149,310 @@ class Maze():
 
 		# save as file
 		pygame.image.save(image_surface, filepath)
-		
+
+	def stream_image(self, filepath, rows, colored, frame_width=None, frame_color=None, tilesize=10):
+		# save a new Eller maze with this maze's width and colors, but any number of rows, as a png
+		# rows are generated and written one at a time -- the full maze is never held in memory
+		colors, line_width, frame_width = self.paper_style(colored, frame_width, frame_color)
+		if self.adaptive_lines: # based on the width only
+			line_width = self.get_line_size(self.cols)
+		save_streamed_image(filepath, rows, self.cols, colors, tilesize, line_width, frame_width)
+
+# PAPER
+def paint_paper(paper, cell, tilesize, color, size=100, symbol=None):
+	# fill size
+	width = tilesize * (size/100) # percent visible
+	height = tilesize * (size/100)
+
+	# fill with color
+	if symbol == None: # square
+		x = cell[1] * tilesize + (tilesize - width) / 2
+		y = cell[0] * tilesize + (tilesize - height) / 2
+		rect = (x, y, width, height)
+		pygame.draw.rect(paper, color, rect)
+	else: # fill with design
+		design = symbol.copy().convert_alpha() # surface
+		# maximally fit design into the tile
+		scale = min(width/design.get_width(), height/design.get_height())
+		design_width = design.get_width() * scale
+		design_height = design.get_height() * scale
+		design = pygame.transform.scale(design, (design_width, design_height))
+		# center the resized design
+		design_x = cell[1] * tilesize + (tilesize - design_width) / 2
+		design_y = cell[0] * tilesize + (tilesize - design_height) / 2
+		design_rect = (design_x, design_y, design_width, design_height)
+		# color the design -- black will be transparent, white will be overridden with color
+		design.set_colorkey(BLACK)
+		design.fill(color, special_flags=pygame.BLEND_MIN) # keeps lower rgb value (fill or previous)
+		# draw design
+		paper.blit(design, design_rect)
+	return
+
+def render_paper(grid, start_cell, finish_cell, colors, line_width, frame_width, p_margin=0, tilesize=50, solution=None):
+	# draw a full maze on a new canvas -- no Maze or display needed (used by export workers)
+	# colors - (line, background, exits, frame)
+	# solution - (path, color) drawn under the walls, or None
+	line_color, bg_color, exit_color, frame_color = colors
+	margin_color = WHITE
+
+	maze_width = (tilesize * grid.cols)
+	maze_height = (tilesize * grid.rows)
+	maze_pos = (frame_width, frame_width) # on board
+	maze_layer = pygame.Surface((maze_width, maze_height)) # inner surface
+
+	# add one to negative borders to balance frame
+	board_width = maze_width + (frame_width * 2) + 1
+	board_height = maze_height + (frame_width * 2) + 1
+	maze_board = pygame.Surface((board_width, board_height))
+
+	# draw maze
+	maze_layer.fill(bg_color) # background
+
+	# exits
+	paint_paper(maze_layer, start_cell, tilesize, exit_color)
+	paint_paper(maze_layer, finish_cell, tilesize, exit_color)
+
+	# solution
+	if solution:
+		path, solution_color = solution
+		half = tilesize / 2
+		points = [((i % grid.cols) * tilesize + half, (i // grid.cols) * tilesize + half) for i in path]
+		if len(points) > 1:
+			pygame.draw.lines(maze_layer, solution_color, False, points, max(1, int(tilesize / 5)))
+
+	# lines -- no frame, since we are drawing the entire maze
+	if can_raster(maze_layer, tilesize, line_width):
+		raster_walls(maze_layer, grid, line_color, tilesize, line_width)
+	else:
+		draw_wall_runs(maze_layer, wall_runs(grid), line_color, tilesize, line_width, (0,0))
+
+	# borders - closed around all edges (no frame)
+	maze_board.fill(frame_color)
+
+	# paste maze to board
+	maze_board.blit(maze_layer, maze_pos)
+	if not p_margin: # no page margins - the board layer is the whole canvas
+		return maze_board
+
+	# get width of margin (for all sides)
+	margin_width = int(min(board_width, board_height) * (p_margin/100) / 2)
+	board_pos = (margin_width, margin_width) # on canvas
+
+	# add page margins
+	canvas_width = board_width + (margin_width * 2)
+	canvas_height = board_height + (margin_width * 2)
+	canvas = pygame.Surface((canvas_width, canvas_height))
+	canvas.fill(margin_color)
+
+	# add maze to canvas
+	canvas.blit(maze_board, board_pos)
+	return canvas
+
+# STREAMING EXPORT
+class PNGWriter():
+	# minimal png encoder (8-bit RGB) -- each row is compressed and written as soon as it arrives
+	# use as a context manager -- closed when done, deleted when an error stops it half way (no truncated files)
+	def __init__(self, filepath, width, height):
+		self.filepath = filepath
+		self.file = open(filepath, "wb")
+		self.compressor = zlib.compressobj(6)
+		self.file.write(b"\x89PNG\r\n\x1a\n") # signature
+		self.write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+	def write_chunk(self, tag, data):
+		crc = zlib.crc32(tag + data) & 0xFFFFFFFF
+		self.file.write(struct.pack(">I", len(data)) + tag + data + struct.pack(">I", crc))
+
+	def write_row(self, pixels):
+		# pixels - width * 3 bytes, no filter
+		data = self.compressor.compress(b"\x00" + pixels)
+		if data:
+			self.write_chunk(b"IDAT", data)
+
+	def close(self):
+		self.write_chunk(b"IDAT", self.compressor.flush())
+		self.write_chunk(b"IEND", b"")
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc, traceback):
+		if exc_type == None:
+			self.close()
+		else:
+			self.file.close()
+			os.remove(self.filepath)
+
+def save_streamed_image(filepath, rows, cols, colors, tilesize=10, line_width=3, frame_width=None):
+	# render an Eller maze straight to a png file, one maze row (a strip of tilesize pixel rows) at a time
+	# same layout as Maze.to_paper() -- frame around the maze with 1 extra pixel on the bottom / right,
+	# start in the bottom left corner and finish in the top right corner
+	# memory stays O(cols * tilesize) no matter how many rows there are
+	line_color, bg_color, exit_color, frame_color = colors
+	if frame_width == None:
+		frame_width = int(line_width/2)
+	offset = int(line_width/2) # walls spill this far into the rows above / below
+	maze_width = tilesize * cols
+	board_width = maze_width + (frame_width * 2) + 1
+	board_height = (tilesize * rows) + (frame_width * 2) + 1
+
+	with PNGWriter(filepath, board_width, board_height) as writer:
+		frame_line = bytes(frame_color) * board_width
+		left_edge = bytes(frame_color) * frame_width
+		right_edge = bytes(frame_color) * (frame_width + 1)
+		strip = pygame.Surface((maze_width, tilesize)) # one row of cells
+		stride = maze_width * 3
+
+		source = eller_rows(cols, rows)
+		prev_codes = None
+		codes = next(source)
+		for _ in range(frame_width): # top frame
+			writer.write_row(frame_line)
+		for row in range(rows):
+			next_codes = next(source, None) # look ahead one row
+			strip.fill(bg_color)
+			# exits
+			if row == 0:
+				pygame.draw.rect(strip, exit_color, ((cols - 1) * tilesize, 0, tilesize, tilesize))
+			if row == rows - 1:
+				pygame.draw.rect(strip, exit_color, (0, 0, tilesize, tilesize))
+			# side walls of the rows above and below spill into this strip
+			if offset:
+				for other_row, other_codes in ((row - 1, prev_codes), (row + 1, next_codes)):
+					if other_codes:
+						for col in range(cols):
+							draw_walls(strip, other_codes[col] & (LEFT | RIGHT), (other_row, col), line_color, tilesize, line_width, (row, 0))
+			for col in range(cols):
+				draw_walls(strip, codes[col], (row, col), line_color, tilesize, line_width, (row, 0))
+			# copy the strip out with the frame on either side
+			pixels = pygame.image.tobytes(strip, "RGB")
+			for y in range(tilesize):
+				writer.write_row(left_edge + pixels[y * stride:(y + 1) * stride] + right_edge)
+			prev_codes = codes
+			codes = next_codes
+		for _ in range(frame_width + 1): # bottom frame
+			writer.write_row(frame_line)
+
+# BATCH EXPORT
+def partial_path(filepath):
+	# where an image is written before it is moved into place -- a stopped export never leaves half an image behind
+	root, extension = os.path.splitext(filepath) # the extension still picks the format
+	return root + ".partial" + extension
+
+def export_job(job):
+	# pool worker -- generate, render and encode one maze file, returns (its path, its metrics or None)
+	# job - (filepath, rows, cols, engine, exits, rng seed, colors, line width, frame width, tilesize, maze, measure, validate)
+	# filepath - None to skip the image
+	# maze - (cells, start, finish, solution) of an existing maze to save instead of a new one, or None
+	# measure - also return maze_metrics() of the maze
+	# validate - check that a new maze is perfect (see Grid.validate()), raises ValueError if not
+	filepath, rows, cols, engine, exits, rng_seed, colors, line_width, frame_width, tilesize, maze, measure, validate = job
+	if maze:
+		cells, start_cell, finish_cell, solution = maze
+		grid = Grid(rows, cols)
+		grid.cells[:] = cells
+	else:
+		random.seed(rng_seed) # independent random stream for every maze
+		grid, start_cell, finish_cell = build_maze(rows, cols, engine, exits=exits, validate=validate)
+		solution = None
+	metrics = None
+	if measure:
+		metrics = maze_metrics(grid, start_cell, finish_cell)
+		metrics["seed"] = rng_seed
+	if filepath:
+		image = render_paper(grid, start_cell, finish_cell, colors, line_width, frame_width, tilesize=tilesize, solution=solution)
+		pygame.image.save(image, partial_path(filepath))
+		os.replace(partial_path(filepath), filepath)
+	return filepath, metrics
+
+def save_job(maze, filepath, colored, frame_width=None, frame_color=None):
+	# job that saves the current maze to one file
+	colors, line_width, frame_width = maze.paper_style(colored, frame_width, frame_color)
+	current = (bytes(maze.data.cells), maze.start_cell, maze.finish_cell, maze.paper_solution(colored))
+	return (filepath, maze.rows, maze.cols, maze.engine, maze.exits, None, colors, line_width, frame_width, 50, current, False, False)
+
+def export_jobs(maze, directory, count, colored, frame_width=None, frame_color=None, extension=".jpg"):
+	# jobs for Maze_1 ... Maze_N in a directory -- Maze_1 is the current maze, the rest are new ones
+	# with the same size, engine and style
+	colors, line_width, frame_width = maze.paper_style(colored, frame_width, frame_color)
+	base_seed = random.getrandbits(64)
+	jobs = []
+	for i in range(count):
+		filepath = os.path.join(directory, "Maze_" + str(i+1) + extension)
+		if i == 0:
+			jobs.append(save_job(maze, filepath, colored, frame_width, frame_color))
+		else:
+			jobs.append((filepath, maze.rows, maze.cols, maze.engine, maze.exits, base_seed + i, colors, line_width, frame_width, 50, None, False, False))
+	return jobs
+
+def run_export(jobs, workers=None, chunksize=1):
+	# generator -- runs export jobs on a process pool and yields (file path, metrics) as each job finishes
+	# every worker generates, renders and encodes its own mazes, so throughput scales with cores
+	# closing the generator early stops the pool -- files the workers were writing are deleted, finished ones are kept
+	# chunksize - jobs handed to a worker at a time, more for many small jobs
+	if workers == None:
+		workers = os.cpu_count() or 1
+	workers = min(workers, len(jobs))
+	if workers <= 1: # not worth starting processes
+		for job in jobs:
+			yield export_job(job)
+		return
+	context = multiprocessing.get_context("spawn") # fresh workers -- never a copy of the open window
+	try:
+		with context.Pool(workers) as pool:
+			for result in pool.imap_unordered(export_job, jobs, chunksize):
+				yield result
+	finally: # the pool has terminated its workers, possibly mid save
+		for job in jobs:
+			if job[0] and os.path.exists(partial_path(job[0])):
+				os.remove(partial_path(job[0]))
+
+class ExportTask():
+	# runs export jobs on a worker thread, so the window keeps drawing -- the menu polls it for progress
+	def __init__(self, jobs, workers=None):
+		self.total = len(jobs)
+		self.done = 0 # files written
+		self.error = None # first error, which ends the export
+		self.cancelled = False
+		self.finished = False
+		self.start_time = time.perf_counter()
+		self.worker = threading.Thread(target=self.run, args=(jobs, workers), name="export", daemon=True)
+		self.worker.start()
+
+	def run(self, jobs, workers):
+		export = run_export(jobs, workers)
+		try:
+			with trace_span("export", "export", files=self.total):
+				for filepath, _ in export:
+					self.done += 1
+					if TRACER != None:
+						TRACER.instant("saved", "export", {"file": filepath})
+					if self.cancelled:
+						break
+		except Exception as e:
+			self.error = e
+		finally:
+			export.close() # stops the pool
+			self.finished = True
+
+	def cancel(self):
+		# stops when the next file is done -- the files still being written are dropped
+		self.cancelled = True
+
+	def rate(self):
+		# files / sec so far
+		elapsed = time.perf_counter() - self.start_time
+		if elapsed <= 0:
+			return 0
+		return self.done / elapsed
+
+	def eta(self):
+		# seconds left, or None before the first file is written
+		rate = self.rate()
+		if not rate:
+			return None
+		return (self.total - self.done) / rate
 
 class Player():
 	## Player specific constants
@@ -1131,12 +2564,12 @@ class Player():
 	def advance_vertically(self, dir, data):
 		# UP
 		if dir[0] < 0:
-			if data[self.cell[0]][self.cell[1]].top == 0: # free top
+			if data.is_open(self.cell[0], self.cell[1], TOP): # free top
 				self.cell[0] += dir[0]
 				return True
 		# DOWN
 		if dir[0] > 0:
-			if data[self.cell[0]][self.cell[1]].bottom == 0: # free bottom
+			if data.is_open(self.cell[0], self.cell[1], BOTTOM): # free bottom
 				self.cell[0] += dir[0]
 				return True
 		return False # did not move
@@ -1144,22 +2577,24 @@ class Player():
 	def advance_horizontally(self, dir, data):
 		# LEFT
 		if dir[1] < 0:
-			if data[self.cell[0]][self.cell[1]].left == 0: # free left
+			if data.is_open(self.cell[0], self.cell[1], LEFT): # free left
 				self.cell[1] += dir[1]
 				return True
 		# RIGHT
 		if dir[1] > 0:
-			if data[self.cell[0]][self.cell[1]].right == 0: # free right
+			if data.is_open(self.cell[0], self.cell[1], RIGHT): # free right
 				self.cell[1] += dir[1]
 				return True
 		return False # did not move
 
-	def move(self, dir, data):
+	def move(self, dir, data, junctions=None):
 		# only advance in one direction per move
 		# only add movement delay if player successfully moved
+		# junctions - JunctionGraph of the maze to run to the next junction or dead end, instead of one tile
 
 		# can move
 		if self.move_counter <= 0:
+			last_cell = self.cell.copy()
 			move_functions = [self.advance_horizontally, self.advance_vertically]
 			# 1 = vertical movement takes precedence
 			# 0 = horizontal movement takes precedence
@@ -1170,6 +2605,11 @@ class Player():
 			# try other direction
 			if not moved:
 				moved = move_functions[alt_direction](dir, data)
+			# keep going along the corridor
+			if moved and junctions:
+				i = last_cell[0] * data.cols + last_cell[1]
+				step = (self.cell[0] - last_cell[0]) * data.cols + (self.cell[1] - last_cell[1])
+				self.cell = list(divmod(junctions.run(i, step), data.cols))
 			# add delay
 			if moved:
 				# constant rate
@@ -1191,10 +2631,10 @@ class Player():
 				maze.draw_star(self.cell, self.highlight, size=design_size, incline=0.45)
 			# crown
 			elif self.victory_symbol == 1:
-				maze.paint(self.cell, self.highlight, size=design_size, symbol=CROWN_IMAGE)
+				maze.paint(self.cell, self.highlight, size=design_size, symbol=get_image("crown"))
 			# hidden crown
 			elif self.victory_symbol == 2:
-				maze.paint(self.cell, self.highlight, size=design_size, symbol=CROWN_2_IMAGE)
+				maze.paint(self.cell, self.highlight, size=design_size, symbol=get_image("crown_2"))
 
 class Text():
 	def __init__(self, text, font, fc, bc=None):
@@ -1337,6 +2777,72 @@ class Background():
 			elif self.border_size < Background.MIN_BORDER_SIZE:
 				self.border_size = Background.MIN_BORDER_SIZE
 
+class FrameStats():
+	# rolling frame timing for the performance overlay (F3) -- collected every frame, drawn only while shown
+	# the main loop marks the end of every stage, which costs one perf_counter() call
+	WINDOW = 60 # frames averaged
+	C_TEXT = TEXT_WHITE
+	C_BACKGROUND = (0, 0, 0, 170)
+	def __init__(self):
+		self.visible = False
+		self.frame_times = deque(maxlen=FrameStats.WINDOW) # whole frames, including the wait for the next tick
+		self.stages = {} # stage name: deque of seconds
+		self.frame_start = time.perf_counter()
+		self.last = self.frame_start
+		self.marked = set() # stages marked this frame
+		self.font = None # created when first shown
+	def toggle(self):
+		self.visible = not self.visible
+	def mark(self, stage):
+		# end of a stage -- the time since the previous mark, added up when a stage runs more than once a frame
+		now = time.perf_counter()
+		times = self.stages.get(stage)
+		if times == None:
+			times = self.stages[stage] = deque(maxlen=FrameStats.WINDOW)
+		if stage in self.marked:
+			times[-1] += now - self.last
+		else:
+			times.append(now - self.last)
+			self.marked.add(stage)
+		if TRACER != None:
+			TRACER.complete(stage, self.last, now, "frame")
+		self.last = now
+	def end_frame(self):
+		# after the clock tick
+		now = time.perf_counter()
+		self.frame_times.append(now - self.frame_start)
+		if TRACER != None:
+			TRACER.complete("frame", self.frame_start, now, "frame")
+		self.frame_start = now
+		self.last = now
+		self.marked.clear()
+	def lines(self, maze):
+		# text of the overlay
+		frame_time = sum(self.frame_times) / max(len(self.frame_times), 1)
+		text = ["frame " + format(frame_time * 1000, ".2f") + " ms   " + format(1 / frame_time if frame_time else 0, ".1f") + " fps"]
+		for stage, times in self.stages.items():
+			text.append(stage.ljust(10) + format(sum(times) / len(times) * 1000, "6.2f") + " ms")
+		build_time = maze.data.build_time
+		text.append("generate  " + (format(build_time * 1000, ".1f") + " ms" if build_time != None else "-"))
+		if maze.lod_shown:
+			text.append("walls: zoom preview from tile " + str(maze.lod_shown))
+		elif maze.wall_layer:
+			text.append("walls: cached layer " + str(maze.wall_layer.get_width()) + "x" + str(maze.wall_layer.get_height()))
+		else:
+			text.append("walls: " + str(maze.visible_walls()) + " tile blits")
+		return text
+	def draw(self, screen, maze):
+		if self.font == None:
+			self.font = pygame.font.SysFont("consolas", max(12, int(16/900 * WIN_SIZE[1])))
+		surfaces = [self.font.render(line, True, FrameStats.C_TEXT) for line in self.lines(maze)]
+		margin = 6
+		height = self.font.get_linesize()
+		panel = pygame.Surface((max(text.get_width() for text in surfaces) + margin * 2, height * len(surfaces) + margin * 2), pygame.SRCALPHA)
+		panel.fill(FrameStats.C_BACKGROUND)
+		for i, text in enumerate(surfaces):
+			panel.blit(text, (margin, margin + i * height))
+		screen.blit(panel, (margin, margin))
+
 # FUNCTIONS
 # --- screen ---
 def screen_init(): # adjust the window size to fit on display screen
@@ -1344,6 +2850,9 @@ def screen_init(): # adjust the window size to fit on display screen
 	global DEFAULT_WINX
 	global DEFAULT_WINY
 	global AR
+	global DISPLAY_SIZE
+	display = pygame.display.Info() # before any window is opened
+	DISPLAY_SIZE = (display.current_w, display.current_h)
 	for i in range(2):
 		if WIN_SIZE[i] > DISPLAY_SIZE[i]:
 			k = 1 if i == 0 else 0
@@ -1466,6 +2975,7 @@ class Settings():
 	def __init__(self, maze, player, background):
 		# original values (constant)
 		self.original_dimensions = [maze.rows, maze.cols]
+		self.queue = maze.queue # MazeQueue (or None) -- starts on the new maze while the menu is still open
 		self.zoom_level = maze.get_zoom()
 		if maze.max_screen_tiles == maze.min_frame_length: # fully zoomed
 			self.zoom_level = 0 # maintain full zoom
@@ -1478,6 +2988,8 @@ class Settings():
 		self.max_player_size = Player.MAX_SIZE
 		# maze
 		self.maze_dimensions = [maze.rows, maze.cols]
+		self.maze_engine = maze.engine
+		self.maze_exits = maze.exits
 		self.maze_color = maze.bg_color
 		self.maze_exit_color = maze.exit_color
 		self.maze_line_color = maze.line_color
@@ -1492,6 +3004,10 @@ class Settings():
 		self.player_ms_2 = player.ms_2
 		self.player_dir_priority = player.dir_priority # 0 - horizontally, 1 - vertically
 		self.player_manual_override = player.manual_override
+	def prepare_maze(self):
+		# point the queue at the maze these settings would create, so one is usually ready when the menu closes
+		if self.queue:
+			self.queue.set_target((self.maze_dimensions[0], self.maze_dimensions[1], self.maze_engine, (0,0), self.maze_exits))
 	def randomize_maze(self):
 		rows = random.randint(self.min_tiles, self.max_tiles)
 		cols = random.randint(self.min_tiles, self.max_tiles)
@@ -1528,6 +3044,8 @@ class Settings():
 			self.night_color = random_color()
 	def reset_maze(self):
 		self.maze_dimensions = [Maze.START_ROWS, Maze.START_COLS]
+		self.maze_engine = Maze.DEFAULT_ENGINE
+		self.maze_exits = Maze.DEFAULT_EXITS
 		self.maze_color = Maze.C_BACKGROUND
 		self.maze_exit_color = Maze.C_EXITS
 		self.maze_line_color = Maze.C_GRID
@@ -1568,12 +3086,22 @@ class Settings():
 # load state
 def load_settings(save_state, maze, player, background):
 	# maze
-	if save_state.maze_dimensions != save_state.original_dimensions: # resized
-		maze.resize(save_state.maze_dimensions)
-		maze.remap() # must be re-generated
+	resized = (save_state.maze_dimensions != save_state.original_dimensions)
+	if resized or save_state.maze_engine != maze.engine:
+		if resized:
+			maze.resize(save_state.maze_dimensions)
+		maze.engine = save_state.maze_engine
+		maze.exits = save_state.maze_exits
+		maze.renew() # must be re-generated (the queue is retargeted to the new settings)
 		maze.set_zoom(save_state.zoom_level) # keep same zoom
 		player.set_pos(maze.start_cell) # reset player position
 		player.escaped = False
+	elif save_state.maze_exits != maze.exits: # same maze, new exits
+		maze.exits = save_state.maze_exits
+		maze.find_exits()
+		maze.set_frame_center(maze.start_cell)
+		player.set_pos(maze.start_cell)
+		player.escaped = False
 	maze.bg_color = save_state.maze_color
 	maze.exit_color = save_state.maze_exit_color
 	maze.line_color = save_state.maze_line_color
@@ -1671,15 +3199,22 @@ def settings_menu(window, save_state):
 	tap_text = Text("Tap Override", menu_font, c_dim)
 	tap_override = Text("", menu_font, c_dim)
 
+	engine_text = Text("Algorithm", menu_font, c_dim)
+	engine_name = Text("", menu_font, c_dim)
+	engine_keys = list(ENGINES) # cycle order
+
+	exits_text = Text("Exits", menu_font, c_dim)
+	exits_name = Text("", menu_font, c_dim)
+
 	line_text = Text("—", menu_font, c_dim)
 
 	## groups
 	option_list = [size_text, c_maze_text, c_ends_text, c_borders_text, c_day_text, c_night_text,
-					c_player_text, c_highlight_text, speed_1_text, speed_2_text, dir_text, tap_text]
+					c_player_text, c_highlight_text, speed_1_text, speed_2_text, dir_text, tap_text, engine_text, exits_text]
 	attribute_list = [maze_dimensions, rgb_maze, rgb_ends, rgb_borders, rgb_day, rgb_night, 
-						rgb_player, rgb_highlight, speed_1, speed_2, dir_priority, tap_override]
+						rgb_player, rgb_highlight, speed_1, speed_2, dir_priority, tap_override, engine_name, exits_name]
 	color_option_list = [1,2,3,4,5,6,7] # option indices that handle color values
-	toggled_option_list = [10,11] # options that are on/off
+	toggled_option_list = [10,11,12,13] # options that are on/off (or cycle once per press)
 
 	# selectors
 	options = len(option_list) # in total
@@ -1767,6 +3302,10 @@ def settings_menu(window, save_state):
 			tap_override.text = "On"
 		else:
 			tap_override.text = "Off"
+		# generation algorithm
+		engine_name.text = ENGINES.get(save_state.maze_engine, ENGINES[Maze.DEFAULT_ENGINE])[0]
+		# exit placement
+		exits_name.text = EXIT_MODES[save_state.maze_exits]
 
 		# update attribute text boxes
 		for attr in attribute_list:
@@ -1862,6 +3401,18 @@ def settings_menu(window, save_state):
 				save_state.player_manual_override = False
 			else:
 				save_state.player_manual_override = True
+		# generation algorithm
+		elif option == 12:
+			# cycle
+			k = engine_keys.index(save_state.maze_engine) if save_state.maze_engine in engine_keys else 0
+			save_state.maze_engine = engine_keys[(k + change) % len(engine_keys)]
+		# exit placement
+		elif option == 13:
+			# toggle
+			if save_state.maze_exits == "longest":
+				save_state.maze_exits = "corners"
+			else:
+				save_state.maze_exits = "longest"
 
 	# get initial selection
 	update_selected()
@@ -2051,8 +3602,9 @@ def settings_menu(window, save_state):
 				# Set Toggled Values
 				if value_selector > -1 and (event.key == pygame.K_UP or event.key == pygame.K_DOWN):
 					if option_selector in toggled_option_list:
-						# apply change to save data
-						set_value(option_selector, value_selector, 1)
+						# apply change to save data (direction only matters when cycling)
+						change = 1 if event.key == pygame.K_UP else -1
+						set_value(option_selector, value_selector, change)
 						# update screen values
 						middle_x = update_values()
 		
@@ -2094,6 +3646,7 @@ def settings_menu(window, save_state):
 
 		# refresh screen
 		pygame.display.update()
+		save_state.prepare_maze() # the queue builds the pending maze meanwhile
 		local_clock.tick(local_fps)
 	return
 
@@ -2240,6 +3793,7 @@ def save_menu(window, maze, background, prompt_str="File Path:  ", save_mode=1):
 	enter_switch = False
 	error_switch = False
 	save_switch = False
+	export_task = None # writing files in the background
 
 	active = True
 
@@ -2259,12 +3813,15 @@ def save_menu(window, maze, background, prompt_str="File Path:  ", save_mode=1):
 		if keys[pygame.K_ESCAPE]:
 			if not menu_switch:
 				menu_switch = True
-				active = False
+				if export_task: # stop saving -- the menu closes once the worker has stopped
+					export_task.cancel()
+				elif not save_switch:
+					active = False
 		else:
 			menu_switch = False
 
 		# submit (enter)
-		if keys[pygame.K_RETURN]:
+		if keys[pygame.K_RETURN] and not save_switch:
 			if enter_switch == False:
 				enter_switch = True
 				# check if the file / directory can be created
@@ -2284,7 +3841,6 @@ def save_menu(window, maze, background, prompt_str="File Path:  ", save_mode=1):
 						f.close()
 						os.remove(filename) # delete temp file
 						save_switch = True # successfully reserved file path
-						active = False # close menu
 					except Exception as e:
 						error_msg = str(e)
 				# acknowledge errors
@@ -2296,29 +3852,33 @@ def save_menu(window, maze, background, prompt_str="File Path:  ", save_mode=1):
 
 		# attempt to save the maze
 		if save_switch == True:
-			## minimum side length of image
-			min_size = 1000
 			c_frame = background.frame_color
 			w_frame = background.border_size
-			try:
-				# save current
-				if save_mode == 0:
-					path = file_box.text[0] + file_extension
-					maze.save_image(path, color_preference, frame_width=w_frame, frame_color=c_frame, size=min_size, bound=0)
-				# save many
-				else:
-					directory = file_box.text[0]
-					os.mkdir(directory) # create folder
-					for i in range(num_saves):
-						filename = "Maze_" + str(i+1) + file_extension # name of next maze
-						new_path = os.path.join(directory, filename)
-						maze.save_image(new_path, color_preference, frame_width=w_frame, frame_color=c_frame, size=min_size, bound=0)
-						maze.remap() # generate new maze
-				# successfully saved
-			except Exception as e:
-				# show error
-				message_box.text = str(e)
-				error_switch = True
+			if export_task == None: # start writing
+				try:
+					# save current
+					if save_mode == 0:
+						path = file_box.text[0] + file_extension
+						jobs = [save_job(maze, path, color_preference, frame_width=w_frame, frame_color=c_frame)]
+					# save many
+					else:
+						directory = file_box.text[0]
+						os.mkdir(directory) # create folder
+						# Maze_1 is the current maze -- the others are generated by the worker processes
+						jobs = export_jobs(maze, directory, num_saves, color_preference, w_frame, c_frame, file_extension)
+					export_task = ExportTask(jobs)
+				except Exception as e:
+					# show error
+					message_box.text = str(e)
+					error_switch = True
+					active = False
+			elif export_task.finished: # worker reported success, the first error, or stopped early
+				if export_task.error:
+					message_box.text = str(export_task.error)
+					error_switch = True
+				if save_mode == 1 and export_task.done > 0:
+					maze.renew() # continue with a new maze
+				active = False # close menu
 
 		# delete characters
 		if keys[pygame.K_BACKSPACE] and not save_switch: # remove button
@@ -2465,8 +4025,21 @@ def save_menu(window, maze, background, prompt_str="File Path:  ", save_mode=1):
 			if save_mode == 0:
 				filename += file_extension
 			saving_text = "Saving " + filename + "..."
-			message_box.text = saving_text
 			message_box.fg_color = c_success
+			if export_task and export_task.cancelled:
+				if export_task.finished:
+					saving_text = "Cancelled -- saved " + str(export_task.done) + " of " + str(export_task.total) + " mazes."
+				else:
+					saving_text = "Cancelling..."
+				message_box.fg_color = c_prompt
+			elif export_task and save_mode == 1:
+				# progress - done, rate, time left
+				saving_text += "  " + str(export_task.done) + " / " + str(export_task.total)
+				saving_text += "  |  " + str(round(export_task.rate(), 1)) + " mazes/s"
+				eta = export_task.eta()
+				if eta != None:
+					saving_text += "  |  " + str(math.ceil(eta)) + "s left"
+			message_box.text = saving_text
 		elif save_mode == 1: # tip
 			message_box.text = "Use arrow keys to increment amount."
 			message_box.fg_color = c_prompt
@@ -2566,10 +4139,13 @@ def controls_menu(window, start_page=2):
 	menu_group = ["Esc = Controls Menu",
 				"Ctrl + O = Options Menu",
 				"Ctrl + S = Save Current",
-				"Ctrl + Alt + S = Save Many"]
+				"Ctrl + Alt + S = Save Many",
+				"F3 = Performance Overlay",
+				"Ctrl + T = Write Trace (MAZE_TRACE)"]
 				
 	button_group = ["G = Generate New Maze",
 					"P = Toggle Play Mode",
+					"H = Show / Hide Solution",
 					"F = Toggle Fullscreen",
 					"Ctrl + V = Toggle Adaptive Lines",
 					"Ctrl + B = Toggle Adaptive Frame",
@@ -2597,6 +4173,7 @@ def controls_menu(window, start_page=2):
 				"5 = Jump to Center"]
 
 	play_group = ["Arrow Keys = Move",
+				"Ctrl + Arrow Keys = Run To Next Junction",
 				"Caps Lock = Switch To Alternate Speed",
 				"Shift = Temporarily Switch Speed",
 				"Alt + Mouse Wheel = Grow / Shrink Player",
@@ -2656,7 +4233,8 @@ def controls_menu(window, start_page=2):
 	arrow_height = int(index_height * 80/100)
 	arrows_selected = [0,0] # determines if the left or right arrow is selected
 	arrow_images = []
-	for image_surf in [L_ARROW, SL_ARROW, R_ARROW, SR_ARROW]:
+	for name in ["left_arrow", "selected_left_arrow", "right_arrow", "selected_right_arrow"]:
+		image_surf = get_image(name)
 		scale = arrow_height / image_surf.get_height()
 		new_width = image_surf.get_width() * scale
 		new_height = image_surf.get_height() * scale
@@ -2806,10 +4384,107 @@ def controls_menu(window, start_page=2):
 		pygame.display.update()
 		local_clock.tick(local_fps)
 
+# COMMAND LINE
+def batch_main(args):
+	# maze_generator.py batch --rows 200 --cols 200 --count 10000 --out dir/ --format png
+	# files stream to disk as workers finish them -- only one maze per worker is ever held in memory
+	parser = argparse.ArgumentParser(prog="maze_generator.py batch", description="Save mazes without opening a window.")
+	parser.add_argument("--rows", type=int, default=Maze.START_ROWS)
+	parser.add_argument("--cols", type=int, default=Maze.START_COLS)
+	parser.add_argument("--count", type=int, default=1, help="number of mazes (Maze_1 ... Maze_N)")
+	parser.add_argument("--out", required=True, help="directory, created if missing")
+	parser.add_argument("--format", default=IMAGE_FORMAT, choices=["jpg", "png", "bmp", "tga"])
+	parser.add_argument("--engine", default=Maze.DEFAULT_ENGINE, choices=list(ENGINES))
+	parser.add_argument("--exits", default=Maze.DEFAULT_EXITS, choices=list(EXIT_MODES))
+	parser.add_argument("--bw", action="store_true", help="black and white")
+	parser.add_argument("--tilesize", type=int, default=50, help="pixels per tile")
+	parser.add_argument("--line-width", type=int, default=None, help="default adapts to the maze size")
+	parser.add_argument("--workers", type=int, default=None, help="default is one per core")
+	parser.add_argument("--seed", type=int, default=None, help="mazes are reproducible for a given seed")
+	parser.add_argument("--metrics", default=None, choices=["csv", "jsonl"], help="write the difficulty of every maze to metrics.csv / metrics.jsonl")
+	parser.add_argument("--no-images", action="store_true", help="only write the metrics")
+	parser.add_argument("--validate", action="store_true", help="check that every maze is perfect (connected, without loops)")
+	parser.add_argument("--stream", action="store_true", help="write eller mazes (ignores --engine, --exits and --format) to png one row at a time -- memory stays flat for any number of rows")
+	options = parser.parse_args(args)
+	if min(options.rows, options.cols) < Maze.MIN_TILES:
+		parser.error("a maze needs at least " + str(Maze.MIN_TILES) + " rows and columns")
+	if options.no_images and not (options.metrics or options.validate):
+		parser.error("--no-images needs --metrics or --validate")
+	if options.stream and (options.metrics or options.no_images or options.validate):
+		parser.error("--stream only writes images")
+
+	# same style as saving from the window
+	colors = (Maze.C_GRID, Maze.C_BACKGROUND, Maze.C_EXITS, Maze.C_GRID)
+	if options.bw:
+		colors = (BLACK, WHITE, LIGHT_GREY, BLACK)
+	line_width = options.line_width
+	if line_width == None:
+		line_width = adaptive_line_size(options.cols if options.stream else max(options.rows, options.cols)) # streamed rows are unbounded
+	frame_width = int(line_width/2)
+	base_seed = options.seed
+	if base_seed == None:
+		base_seed = random.getrandbits(64)
+
+	os.makedirs(options.out, exist_ok=True)
+	if options.stream:
+		stream_main(options, colors, line_width, frame_width, base_seed)
+		return
+	jobs = []
+	for i in range(options.count):
+		filepath = None
+		if not options.no_images:
+			filepath = os.path.join(options.out, "Maze_" + str(i+1) + "." + options.format)
+		jobs.append((filepath, options.rows, options.cols, options.engine, options.exits, base_seed + i, colors, line_width, frame_width, options.tilesize, None, bool(options.metrics), options.validate))
+	report = None
+	if options.metrics:
+		# rows arrive in the order the mazes finish -- "maze" is the N of Maze_N
+		report = MetricsReport(os.path.join(options.out, "metrics." + options.metrics), ["maze", "seed", "rows", "cols", "engine", "exits"] + METRIC_FIELDS)
+	chunksize = 1
+	if options.no_images: # tiny jobs -- fewer round trips to the workers
+		chunksize = max(1, options.count // (16 * (options.workers or os.cpu_count() or 1)))
+
+	start_time = time.perf_counter()
+	saved = 0
+	try:
+		with trace_span("export", "export", files=options.count):
+			for filepath, metrics in run_export(jobs, options.workers, chunksize):
+				saved += 1
+				if TRACER != None:
+					TRACER.instant("saved", "export", {"file": filepath})
+				if report:
+					metrics.update(maze=metrics["seed"] - base_seed + 1, rows=options.rows, cols=options.cols, engine=options.engine, exits=options.exits)
+					report.write_row(metrics)
+	except ValueError as e: # --validate found a broken maze
+		print("Error: " + str(e))
+		sys.exit(1)
+	finally:
+		if report:
+			report.close()
+	elapsed = time.perf_counter() - start_time
+	verb = "Saved "
+	if options.no_images:
+		verb = "Measured " if options.metrics else "Checked "
+	print(verb + str(saved) + " mazes to " + options.out + " in " + str(round(elapsed, 2)) + "s (" + str(round(saved / max(elapsed, 1e-9), 1)) + " mazes/s)")
+
+def stream_main(options, colors, line_width, frame_width, base_seed):
+	# batch --stream: eller mazes rendered row by row straight to png, one after another in this process
+	# (the whole maze is never held, so the workers have nothing to gain)
+	start_time = time.perf_counter()
+	with trace_span("export", "export", files=options.count):
+		for i in range(options.count):
+			filepath = os.path.join(options.out, "Maze_" + str(i+1) + ".png")
+			random.seed(base_seed + i)
+			save_streamed_image(filepath, options.rows, options.cols, colors, options.tilesize, line_width, frame_width)
+			if TRACER != None:
+				TRACER.instant("saved", "export", {"file": filepath})
+	elapsed = time.perf_counter() - start_time
+	print("Saved " + str(options.count) + " mazes to " + options.out + " in " + str(round(elapsed, 2)) + "s (" + str(round(options.count / max(elapsed, 1e-9), 1)) + " mazes/s)")
+
 # MAIN
 def main():
+	pygame.init()
 	pygame.display.set_caption("Maze Generator")
-	pygame.display.set_icon(MAZE_ICON)
+	pygame.display.set_icon(get_image("maze_icon"))
 
 	screen_init() # ensure window can fit on screen
 	screen = pygame.display.set_mode(WIN_SIZE)
@@ -2823,16 +4498,24 @@ def main():
 	maze_seed = [0,0]
 	new_maze = Maze((Maze.START_ROWS, Maze.START_COLS), fps)
 	new_maze.remap(maze_seed)
+	new_maze.queue = MazeQueue() # pre-generate the next mazes in the background
+	new_maze.queue.set_target((new_maze.rows, new_maze.cols, new_maze.engine, tuple(maze_seed), new_maze.exits))
 
 	# create player
 	new_player = Player(Player.COLOR, fps)
 	new_player.set_pos(new_maze.start_cell)
 
+	# performance overlay
+	frame_stats = FrameStats()
+
 	# switches - must be manually pressed each time
 	a_switch = False
 	b_switch = False
 	f_switch = False
 	g_switch = False
+	h_switch = False
+	hud_switch = False
+	trace_switch = False
 	m_switch = False
 	n_switch = False
 	p_switch = False
@@ -2873,14 +4556,16 @@ def main():
 		if keys[pygame.K_ESCAPE]:
 			if not menu_switch:
 				menu_switch = True
-				controls_menu(screen)
+				with trace_span("controls_menu", "menu"):
+					controls_menu(screen)
 
 		# SETTINGS
 		elif ctrl_held and keys[pygame.K_o]:
 			if not menu_switch:
 				menu_switch = True
 				state = Settings(new_maze, new_player, new_background)
-				settings_menu(screen, state)
+				with trace_span("settings_menu", "menu"):
+					settings_menu(screen, state)
 				load_settings(state, new_maze, new_player, new_background)
 
 		# SAVE
@@ -2892,7 +4577,8 @@ def main():
 				if alt_held:
 					mode = 1 # save many
 					prompt = "Enter Folder:  "
-				save_menu(screen, new_maze, new_background, prompt, mode)
+				with trace_span("save_menu", "menu"):
+					save_menu(screen, new_maze, new_background, prompt, mode)
 
 		else: # RESET MENU SWITCH
 			menu_switch = False # all menu buttons released
@@ -2939,12 +4625,37 @@ def main():
 		if keys[pygame.K_g]:
 			if not g_switch:
 				g_switch = True
-				new_maze.remap(maze_seed)
+				new_maze.renew(maze_seed) # instant when a maze is ready
 				new_player.set_pos(new_maze.start_cell)
 				new_player.escaped = False # new map
 		else:
 			g_switch = False
 
+		# SOLUTION
+		if keys[pygame.K_h]:
+			if not h_switch:
+				h_switch = True
+				new_maze.toggle_solution()
+		else:
+			h_switch = False
+
+		# PERFORMANCE OVERLAY
+		if keys[pygame.K_F3]:
+			if not hud_switch:
+				hud_switch = True
+				frame_stats.toggle()
+		else:
+			hud_switch = False
+
+		# WRITE TRACE
+		if ctrl_held and keys[pygame.K_t]:
+			if not trace_switch:
+				trace_switch = True
+				if TRACER != None:
+					TRACER.flush()
+		else:
+			trace_switch = False
+
 		# ALIGN
 		if keys[pygame.K_a] and not playing:
 			if not a_switch:
@@ -3161,7 +4872,8 @@ def main():
 				new_player.cont_movement = False # kill momentum
 				if new_player.manual_override:
 					new_player.move_counter = 0 # startup immediately
-			new_player.move(move_dir, new_maze.data) # move to new cell (if possible)
+			junctions = new_maze.get_junctions() if ctrl_held else None # ctrl - run to the next junction
+			new_player.move(move_dir, new_maze.data, junctions) # move to new cell (if possible)
 			new_player.check_escaped(new_maze.finish_cell)
 			new_maze.set_frame_center(new_player.cell) # center window around player
 
@@ -3240,22 +4952,55 @@ def main():
 					else:
 						new_maze.scroll([-event.y, event.x]) # vertical
 
+		frame_stats.mark("input")
+
 		# UPDATE DISPLAY
 		# ----- background screen -----
 		screen.fill(new_background.color)
 		# ----- maze -----
-		new_maze.fill()
-		new_maze.draw_exits()
-		if playing:
-			new_player.draw(new_maze)
-		new_maze.draw_borders()
+		# without the player only the part of the maze scrolled into view is drawn
+		new_maze.tick()
+		clips = new_maze.scroll_view(not playing)
+		for clip in clips:
+			new_maze.surface.set_clip(clip)
+			new_maze.fill()
+			frame_stats.mark("fill")
+			new_maze.draw_exits()
+			frame_stats.mark("exits")
+			if new_maze.show_solution:
+				new_maze.draw_solution()
+			frame_stats.mark("solution")
+			if playing:
+				new_player.draw(new_maze)
+			frame_stats.mark("player")
+			new_maze.draw_borders()
+			frame_stats.mark("walls")
+		if not clips: # nothing changed -- the maze stages are still timed (as nothing), so they cover every frame
+			for stage in ("fill", "exits", "solution", "player", "walls"):
+				frame_stats.mark(stage)
+		new_maze.surface.set_clip(None)
 		new_maze.draw_board(screen, new_background.border_size, new_background.frame_color) # outside border around maze
+		frame_stats.mark("board")
 		screen.blit(new_maze.surface, new_maze.win_pos) # add maze to screen
+		frame_stats.mark("blit")
+		if frame_stats.visible:
+			frame_stats.draw(screen, new_maze)
+			frame_stats.mark("overlay")
 		# ----- refresh -----
 		pygame.display.update() # draw to screen
+		frame_stats.mark("update")
 		clock.tick(fps)
+		frame_stats.end_frame()
 	return
 
-random.seed(time.time()) # generate random seed
-main()
-pygame.quit()
\ No newline at end of file
+if __name__ == "__main__":
+	multiprocessing.freeze_support() # export workers of the frozen (exe) build
+	random.seed(time.time()) # generate random seed
+	if os.environ.get("MAZE_TRACE"):
+		start_tracing(os.environ["MAZE_TRACE"])
+	if sys.argv[1:2] == ["batch"]:
+		os.environ["SDL_VIDEODRIVER"] = "dummy" # never opens a window -- also inherited by the export workers
+		batch_main(sys.argv[2:])
+	else:
+		main()
+	pygame.quit()